@@ -1,20 +1,39 @@
 """The Bitpanda integration."""
+from datetime import timedelta
 import logging
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
 from homeassistant.core import HomeAssistant
 from homeassistant.exceptions import ConfigEntryNotReady
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
-
-from .api import BitpandaApiClient
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+
+from .activity import ActivitySync
+from .api import PRICE_ENDPOINTS, WALLET_ENDPOINTS, BitpandaApiClient
+from .breaker import StaleDataGuard
+from .coordinator import BitpandaDataUpdater
+from .performance import PortfolioPerformanceTracker
 from .const import (
+    ACTIVITY_STORAGE_VERSION,
     CONF_API_KEY,
     CONF_CURRENCY,
+    CONF_JSON_EXECUTOR_THRESHOLD,
+    CONF_MAX_STALENESS,
+    DEFAULT_MAX_STALENESS,
     DOMAIN,
+    JSON_EXECUTOR_THRESHOLD,
+    PERFORMANCE_STORAGE_VERSION,
     PRICE_UPDATE_INTERVAL,
+    REFRESH_TARGET_PRICES,
+    REFRESH_TARGET_WALLETS,
     WALLET_UPDATE_INTERVAL,
 )
+from .services import (
+    async_setup_services,
+    async_unload_services,
+    create_refresh_debouncer,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -27,36 +46,38 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     currency = entry.data[CONF_CURRENCY]
     
     session = async_get_clientsession(hass)
-    client = BitpandaApiClient(api_key, session)
+    executor_threshold = entry.options.get(
+        CONF_JSON_EXECUTOR_THRESHOLD, JSON_EXECUTOR_THRESHOLD // 1024
+    )
+    client = BitpandaApiClient(api_key, session, executor_threshold * 1024)
 
-    # Create coordinators for different update intervals
-    async def async_update_prices():
-        """Fetch price data from API."""
-        try:
-            return await client.async_get_ticker()
-        except Exception as err:
-            raise UpdateFailed(f"Error communicating with API: {err}")
+    activity = ActivitySync(hass, entry.entry_id, client, currency)
+    await activity.async_load()
+    performance_tracker = PortfolioPerformanceTracker(
+        hass, entry.entry_id, currency, activity
+    )
+    await performance_tracker.async_load()
+
+    # Bei API-Störungen die letzten guten Daten bis zu max_staleness weiter liefern
+    stale_guard = StaleDataGuard(
+        timedelta(minutes=entry.options.get(CONF_MAX_STALENESS, DEFAULT_MAX_STALENESS))
+    )
+
+    updater = BitpandaDataUpdater(client, stale_guard, performance_tracker, activity)
 
+    # Create coordinators for different update intervals
     async def async_update_wallets():
-        """Fetch wallet data from API."""
-        try:
-            asset_wallets = await client.async_get_asset_wallets()
-            fiat_wallets = await client.async_get_fiat_wallets()
-            crypto_wallets = await client.async_get_crypto_wallets()
-            
-            return {
-                "asset_wallets": asset_wallets,
-                "fiat_wallets": fiat_wallets,
-                "crypto_wallets": crypto_wallets,
-            }
-        except Exception as err:
-            raise UpdateFailed(f"Error communicating with API: {err}")
+        """Fetch wallet data and update derived statistics."""
+        # Beim Setup-Refresh keine Historie nachladen, um den Start nicht zu blockieren
+        return await updater.async_update_wallets(
+            price_coordinator.data, backfill=wallet_coordinator.data is not None
+        )
 
     price_coordinator = DataUpdateCoordinator(
         hass,
         _LOGGER,
         name=f"{DOMAIN}_prices",
-        update_method=async_update_prices,
+        update_method=updater.async_update_prices,
         update_interval=PRICE_UPDATE_INTERVAL,
         config_entry=entry,
     )
@@ -86,8 +107,21 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         "price_coordinator": price_coordinator,
         "wallet_coordinator": wallet_coordinator,
         "currency": currency,
+        "performance_tracker": performance_tracker,
+        "activity": activity,
+        "stale_guard": stale_guard,
+        "refresh_debouncers": {
+            REFRESH_TARGET_PRICES: create_refresh_debouncer(
+                hass, client, price_coordinator, PRICE_ENDPOINTS
+            ),
+            REFRESH_TARGET_WALLETS: create_refresh_debouncer(
+                hass, client, wallet_coordinator, WALLET_ENDPOINTS
+            ),
+        },
     }
 
+    async_setup_services(hass)
+
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
     # GEÄNDERT: Verwende async_update_options statt async_reload_entry
@@ -99,11 +133,23 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
-        hass.data[DOMAIN].pop(entry.entry_id)
+        entry_data = hass.data[DOMAIN].pop(entry.entry_id)
+        for debouncer in entry_data["refresh_debouncers"].values():
+            debouncer.async_shutdown()
+        async_unload_services(hass)
 
     return unload_ok
 
 
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the stored performance and activity data of a config entry."""
+    for version, name in (
+        (PERFORMANCE_STORAGE_VERSION, "performance"),
+        (ACTIVITY_STORAGE_VERSION, "activity"),
+    ):
+        await Store(hass, version, f"{DOMAIN}.{entry.entry_id}.{name}").async_remove()
+
+
 async def async_update_options(hass: HomeAssistant, entry: ConfigEntry) -> None:
     """Handle options update."""
     # GEÄNDERT: Reload nur die Sensor-Plattform, nicht die ganze Integration
@@ -0,0 +1,377 @@
+"""Incremental sync of staking rewards and savings-plan executions."""
+from decimal import Decimal, InvalidOperation
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import aiohttp
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .api import BitpandaApiClient
+from .const import (
+    ACTIVITY_BACKFILL_PAGE_SIZE,
+    ACTIVITY_MAX_BACKFILL_PAGES,
+    ACTIVITY_PAGE_SIZE,
+    ACTIVITY_SAVE_DELAY,
+    ACTIVITY_STORAGE_VERSION,
+    DOMAIN,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+STREAM_STAKING = "staking"
+STREAM_SAVINGS = "savings"
+
+# Tags, mit denen Bitpanda Staking-Rewards kennzeichnet
+STAKING_TAGS = ("reward", "staking")
+
+
+def _decimal(value: Any) -> Decimal:
+    """Convert an API amount to Decimal."""
+    try:
+        return Decimal(str(value))
+    except (InvalidOperation, ValueError):
+        return Decimal(0)
+
+
+def _unix(item: Dict[str, Any]) -> int:
+    """Return the unix timestamp of a transaction or trade."""
+    try:
+        return int(item["attributes"]["time"]["unix"])
+    except (KeyError, TypeError, ValueError):
+        return 0
+
+
+def is_staking_reward(item: Dict[str, Any]) -> bool:
+    """Return True if a wallet transaction is a staking reward."""
+    attributes = item.get("attributes", {})
+    if attributes.get("in_or_out") != "incoming":
+        return False
+    if attributes.get("status") not in (None, "finished"):
+        return False
+    for tag in attributes.get("tags") or []:
+        short_name = str(tag.get("attributes", {}).get("short_name", "")).lower()
+        if any(name in short_name for name in STAKING_TAGS):
+            return True
+    return False
+
+
+def is_savings_execution(item: Dict[str, Any]) -> bool:
+    """Return True if a trade was executed by a savings plan."""
+    attributes = item.get("attributes", {})
+    return attributes.get("type") == "buy" and bool(attributes.get("is_savings"))
+
+
+class ActivitySync:
+    """Fetch only new pages of paginated endpoints and keep per-asset totals."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry_id: str,
+        client: BitpandaApiClient,
+        currency: str,
+    ) -> None:
+        """Initialize the sync."""
+        self._client = client
+        self._currency = currency
+        self._store: Store = Store(
+            hass,
+            ACTIVITY_STORAGE_VERSION,
+            f"{DOMAIN}.{entry_id}.activity",
+        )
+        self._streams: Dict[str, Dict[str, Any]] = {
+            STREAM_STAKING: self._empty_stream(),
+            STREAM_SAVINGS: self._empty_stream(),
+        }
+        # Streams ohne Berechtigung (fehlender API-Scope) bis zum Reload überspringen
+        self._disabled: set[str] = set()
+        self._symbols: Dict[str, str] = {}
+        self._fiat_symbols: Dict[str, str] = {}
+        # Tag (ordinal) -> Symbol -> Bestandsänderung durch Trades und Rewards
+        self._ledger: Dict[str, Dict[str, str]] = {}
+
+    @staticmethod
+    def _empty_stream() -> Dict[str, Any]:
+        """Return the initial state of a stream."""
+        return {"hwm": None, "hwm_ids": [], "backfill_cursor": None, "totals": {}}
+
+    async def async_load(self) -> None:
+        """Load the stored high-water marks and totals."""
+        stored = await self._store.async_load()
+        if stored:
+            self._streams.update(stored.get("streams", {}))
+            self._ledger = stored.get("ledger", {})
+
+    def _data_to_save(self) -> Dict[str, Any]:
+        """Return the store payload."""
+        return {"streams": self._streams, "ledger": self._ledger}
+
+    def totals(self, stream: str) -> Dict[str, Dict[str, Any]]:
+        """Return the running totals per asset of a stream."""
+        return self._streams[stream]["totals"]
+
+    def _symbol(self, attributes: Dict[str, Any]) -> Optional[str]:
+        """Resolve the asset symbol of a transaction or trade."""
+        symbol = attributes.get("cryptocoin_symbol")
+        if symbol:
+            return symbol
+        return self._symbols.get(str(attributes.get("cryptocoin_id")))
+
+    @staticmethod
+    def _position(state: Dict[str, Any]) -> tuple:
+        """Return the sync position of a stream, to detect changes."""
+        return (state["hwm"], list(state["hwm_ids"]), state["backfill_cursor"])
+
+    def _update_symbols(self, wallet_data: Optional[Dict[str, Any]]) -> None:
+        """Map cryptocoin and fiat ids to symbols from the wallet data."""
+        if not isinstance(wallet_data, dict):
+            return
+        crypto_wallets = wallet_data.get("crypto_wallets")
+        if isinstance(crypto_wallets, dict):
+            for wallet in crypto_wallets.get("data", []):
+                attributes = wallet.get("attributes", {})
+                if attributes.get("cryptocoin_id") and attributes.get(
+                    "cryptocoin_symbol"
+                ):
+                    self._symbols[str(attributes["cryptocoin_id"])] = attributes[
+                        "cryptocoin_symbol"
+                    ]
+        for wallet in (wallet_data.get("fiat_wallets") or {}).values():
+            if wallet.get("fiat_id"):
+                self._fiat_symbols[str(wallet["fiat_id"])] = wallet["symbol"]
+
+    def movements_since(self, day: Optional[int]) -> Dict[str, float]:
+        """Return the balance changes per symbol recorded after ``day``.
+
+        These are changes caused by trades against the portfolio currency and
+        by staking rewards, i.e. not deposits or withdrawals.
+        """
+        movements: Dict[str, Decimal] = {}
+        for recorded, amounts in self._ledger.items():
+            if day is not None and int(recorded) <= day:
+                continue
+            for symbol, amount in amounts.items():
+                movements[symbol] = movements.get(symbol, Decimal(0)) + _decimal(
+                    amount
+                )
+        return {symbol: float(amount) for symbol, amount in movements.items()}
+
+    def prune_movements(self, day: int) -> None:
+        """Drop balance changes recorded on or before ``day``."""
+        closed = [recorded for recorded in self._ledger if int(recorded) <= day]
+        for recorded in closed:
+            del self._ledger[recorded]
+        if closed:
+            self._store.async_delay_save(self._data_to_save, ACTIVITY_SAVE_DELAY)
+
+    async def async_sync(
+        self,
+        wallet_data: Optional[Dict[str, Any]] = None,
+        backfill: bool = True,
+    ) -> bool:
+        """Sync both streams; return True if any totals changed.
+
+        With ``backfill=False`` only the newest pages are fetched, e.g. during
+        setup, and older history is loaded on later polls.
+        """
+        self._update_symbols(wallet_data)
+        changed = False
+        dirty = False
+        for stream, fetch, accept, apply, record in (
+            (
+                STREAM_STAKING,
+                self._client.async_get_crypto_transactions,
+                is_staking_reward,
+                self._apply_staking,
+                self._record_reward,
+            ),
+            (
+                STREAM_SAVINGS,
+                self._client.async_get_trades,
+                is_savings_execution,
+                self._apply_savings,
+                self._record_trade,
+            ),
+        ):
+            if stream in self._disabled:
+                continue
+            state = self._streams[stream]
+            position = self._position(state)
+            # Beim ersten Sync ist alles Historie vor Beginn der Renditeberechnung
+            tracked = state["hwm"] is not None
+            try:
+                new_items, older_items = await self._async_fetch_new(
+                    stream, fetch, backfill
+                )
+            except aiohttp.ClientResponseError as err:
+                if err.status in (401, 403):
+                    _LOGGER.warning(
+                        "Bitpanda API key lacks access for %s data, skipping it: %s",
+                        stream,
+                        err,
+                    )
+                    self._disabled.add(stream)
+                    continue
+                _LOGGER.debug("Error syncing %s data: %s", stream, err)
+                continue
+            except Exception as err:
+                _LOGGER.debug("Error syncing %s data: %s", stream, err)
+                continue
+
+            if position != self._position(state):
+                dirty = True
+            totals = state["totals"]
+            for item in new_items + older_items:
+                if accept(item):
+                    symbol = self._symbol(item["attributes"])
+                    if symbol:
+                        apply(totals.setdefault(symbol, {}), item)
+                        changed = True
+            if tracked:
+                for item in new_items:
+                    if record(item):
+                        dirty = True
+
+        if dirty or changed:
+            self._store.async_delay_save(self._data_to_save, ACTIVITY_SAVE_DELAY)
+        return changed
+
+    async def _async_fetch_new(
+        self,
+        stream: str,
+        fetch: Callable[..., Awaitable[Dict[str, Any]]],
+        backfill: bool,
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Fetch items newer than the high-water mark, plus one backfill slice.
+
+        Returns the new items and the backfilled older items separately.
+
+        The stream state is only advanced after every page was fetched, so a
+        failed request never leaves a gap.
+        """
+        state = self._streams[stream]
+        hwm = state["hwm"]
+        hwm_ids = set(state["hwm_ids"])
+        head_items: List[Dict[str, Any]] = []
+        backfill_items: List[Dict[str, Any]] = []
+        backfill_cursor = state["backfill_cursor"]
+
+        # Neueste Seiten bis zur Hochwassermarke (im Normalbetrieb genau eine)
+        cursor = None
+        while True:
+            page = await fetch(cursor=cursor, page_size=ACTIVITY_PAGE_SIZE)
+            items = page.get("data") or []
+            reached_hwm = False
+            for item in items:
+                timestamp = _unix(item)
+                if hwm is not None and (
+                    timestamp < hwm
+                    or (timestamp == hwm and item.get("id") in hwm_ids)
+                ):
+                    reached_hwm = True
+                    break
+                head_items.append(item)
+            cursor = (page.get("meta") or {}).get("next_cursor")
+            if reached_hwm or not items or not cursor:
+                break
+            if hwm is None:
+                # Erster Sync: Rest der Historie schrittweise nachladen
+                backfill_cursor = cursor
+                break
+
+        # Ältere Historie in begrenzten Portionen nachladen
+        backfill_pages = 0
+        while (
+            backfill
+            and backfill_cursor
+            and backfill_pages < ACTIVITY_MAX_BACKFILL_PAGES
+        ):
+            page = await fetch(
+                cursor=backfill_cursor, page_size=ACTIVITY_BACKFILL_PAGE_SIZE
+            )
+            backfill_pages += 1
+            backfill_items.extend(page.get("data") or [])
+            backfill_cursor = (page.get("meta") or {}).get("next_cursor")
+
+        if hwm is None and not head_items:
+            # Leere Historie: spätere Einträge sind damit eindeutig neu
+            hwm = 0
+        if head_items:
+            newest = max(_unix(item) for item in head_items)
+            if hwm is None or newest > hwm:
+                hwm = newest
+                hwm_ids = set()
+            hwm_ids.update(item.get("id") for item in head_items if _unix(item) == hwm)
+        state["hwm"] = hwm
+        state["hwm_ids"] = sorted(i for i in hwm_ids if i)
+        state["backfill_cursor"] = backfill_cursor
+        return head_items, backfill_items
+
+    def _add_movement(self, symbol: str, amount: Decimal) -> None:
+        """Book a balance change on today's ledger entry."""
+        day = str(dt_util.now().date().toordinal())
+        movements = self._ledger.setdefault(day, {})
+        movements[symbol] = str(_decimal(movements.get(symbol, 0)) + amount)
+
+    def _record_reward(self, item: Dict[str, Any]) -> bool:
+        """Book a staking reward as return instead of an inflow."""
+        if not is_staking_reward(item):
+            return False
+        symbol = self._symbol(item["attributes"])
+        if not symbol:
+            return False
+        self._add_movement(symbol, _decimal(item["attributes"].get("amount")))
+        return True
+
+    def _record_trade(self, item: Dict[str, Any]) -> bool:
+        """Book both legs of a trade against the portfolio currency."""
+        attributes = item.get("attributes", {})
+        if attributes.get("type") == "buy":
+            sign = 1
+        elif attributes.get("type") == "sell":
+            sign = -1
+        else:
+            return False
+        # Trades gegen andere Fiat-Währungen bleiben Zu-/Abflüsse, da deren
+        # Wallets nicht bewertet werden
+        fiat_symbol = self._fiat_symbols.get(str(attributes.get("fiat_id")))
+        symbol = self._symbol(attributes)
+        if fiat_symbol != self._currency or not symbol:
+            return False
+        amount = _decimal(attributes.get("amount_cryptocoin"))
+        self._add_movement(symbol, sign * amount)
+        self._add_movement(fiat_symbol, -sign * _decimal(attributes.get("amount_fiat")))
+        return True
+
+    @staticmethod
+    def _apply_staking(total: Dict[str, Any], item: Dict[str, Any]) -> None:
+        """Add a staking reward to the running total of its asset."""
+        attributes = item["attributes"]
+        total["amount"] = str(
+            _decimal(total.get("amount", 0)) + _decimal(attributes.get("amount"))
+        )
+        total["count"] = total.get("count", 0) + 1
+        total["last"] = max(total.get("last", 0), _unix(item))
+
+    def _apply_savings(self, total: Dict[str, Any], item: Dict[str, Any]) -> None:
+        """Add a savings-plan execution to the running total of its asset.
+
+        The invested amount is kept per fiat currency of the execution.
+        """
+        attributes = item["attributes"]
+        total["amount"] = str(
+            _decimal(total.get("amount", 0))
+            + _decimal(attributes.get("amount_cryptocoin"))
+        )
+        fiat_symbol = self._fiat_symbols.get(str(attributes.get("fiat_id")))
+        invested = total.setdefault("invested", {})
+        # Ohne bekanntes Fiat-Wallet lässt sich der Betrag keiner Währung zuordnen
+        if fiat_symbol:
+            invested[fiat_symbol] = str(
+                _decimal(invested.get(fiat_symbol, 0))
+                + _decimal(attributes.get("amount_fiat"))
+            )
+        total["count"] = total.get("count", 0) + 1
+        total["last"] = max(total.get("last", 0), _unix(item))
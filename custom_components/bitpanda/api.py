@@ -1,84 +1,250 @@
 """API client for Bitpanda."""
 import asyncio
 import logging
-from typing import Any, Dict, Optional
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
 import aiohttp
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
 
-from .const import API_BASE_URL, API_TICKER_URL
+from .const import (
+    API_BASE_URL,
+    API_TICKER_URL,
+    JSON_EXECUTOR_THRESHOLD,
+    MIN_REQUEST_INTERVAL,
+)
+from .breaker import CircuitBreaker
+from .cassette import AiohttpTransport, RecordingTransport
+from .payload import decode_payload
 
 _LOGGER = logging.getLogger(__name__)
 
+ENDPOINT_TICKER = "ticker"
+ENDPOINT_ASSET_WALLETS = "asset_wallets"
+ENDPOINT_FIAT_WALLETS = "fiat_wallets"
+ENDPOINT_CRYPTO_WALLETS = "crypto_wallets"
+ENDPOINT_CRYPTO_TRANSACTIONS = "crypto_transactions"
+ENDPOINT_TRADES = "trades"
+
+PRICE_ENDPOINTS = (ENDPOINT_TICKER,)
+WALLET_ENDPOINTS = (
+    ENDPOINT_ASSET_WALLETS,
+    ENDPOINT_FIAT_WALLETS,
+    ENDPOINT_CRYPTO_WALLETS,
+    ENDPOINT_CRYPTO_TRANSACTIONS,
+    ENDPOINT_TRADES,
+)
+
 
 class BitpandaApiClient:
     """Bitpanda API Client."""
 
-    def __init__(self, api_key: str, session: aiohttp.ClientSession) -> None:
-        """Initialize the API client."""
+    def __init__(
+        self,
+        api_key: str,
+        session: Optional[aiohttp.ClientSession],
+        executor_threshold: int = JSON_EXECUTOR_THRESHOLD,
+        transport=None,
+    ) -> None:
+        """Initialize the API client.
+
+        ``transport`` replaces the aiohttp session, e.g. with a
+        ``ReplayTransport`` for offline runs.
+        """
         self._api_key = api_key
         self._session = session
+        self._transport = transport or AiohttpTransport(session)
         self._headers = {"X-Api-Key": api_key}
+        self._executor_threshold = executor_threshold
+        self.decode_stats: Dict[str, float] = {
+            "inline_count": 0,
+            "inline_seconds": 0.0,
+            "offloaded_count": 0,
+            "offloaded_bytes": 0,
+            # Zeit, die ohne Executor auf dem Event-Loop blockiert hätte
+            "loop_seconds_saved": 0.0,
+        }
+        # Zeitpunkt (monotonic) der letzten Anfrage je Endpoint
+        self._last_request: Dict[str, float] = {}
+        # Abruf- und Dekodierzeiten je Endpoint (für Replay-Messungen)
+        self.request_stats: Dict[str, Dict[str, float]] = {}
+        self.breakers: Dict[str, CircuitBreaker] = {}
 
-    async def async_get_ticker(self) -> Dict[str, Any]:
-        """Get price ticker data."""
+    def breaker(self, endpoint: str) -> CircuitBreaker:
+        """Return the circuit breaker of an endpoint."""
+        if endpoint not in self.breakers:
+            self.breakers[endpoint] = CircuitBreaker(endpoint)
+        return self.breakers[endpoint]
+
+    @property
+    def recording(self) -> bool:
+        """Return True while traffic is being recorded."""
+        return isinstance(self._transport, RecordingTransport)
+
+    def start_recording(self) -> None:
+        """Start capturing responses into a cassette."""
+        if not self.recording:
+            self._transport = RecordingTransport(self._transport)
+
+    def stop_recording(self) -> Optional[RecordingTransport]:
+        """Stop capturing and return the recorder holding the traffic."""
+        if not self.recording:
+            return None
+        recorder = self._transport
+        self._transport = recorder.inner
+        return recorder
+
+    def seconds_until_allowed(self, *endpoints: str) -> float:
+        """Return how long to wait before the endpoints fit the rate budget."""
+        now = time.monotonic()
+        interval = MIN_REQUEST_INTERVAL.total_seconds()
+        wait = 0.0
+        for endpoint in endpoints:
+            last = self._last_request.get(endpoint)
+            if last is not None:
+                wait = max(wait, last + interval - now)
+        return wait
+
+    async def _async_decode(
+        self, raw: bytes, normalizer: Optional[Callable[[Any], Any]]
+    ) -> Tuple[Any, float]:
+        """Decode a response body, offloading large payloads to an executor.
+
+        Returns the result and the time spent decoding.
+        """
+        if len(raw) < self._executor_threshold:
+            start = time.perf_counter()
+            result = decode_payload(raw, normalizer)
+            elapsed = time.perf_counter() - start
+            self.decode_stats["inline_count"] += 1
+            self.decode_stats["inline_seconds"] += elapsed
+            return result, elapsed
+
+        def _timed_decode():
+            start = time.perf_counter()
+            result = decode_payload(raw, normalizer)
+            return result, time.perf_counter() - start
+
+        loop = asyncio.get_running_loop()
+        result, elapsed = await loop.run_in_executor(None, _timed_decode)
+        self.decode_stats["offloaded_count"] += 1
+        self.decode_stats["offloaded_bytes"] += len(raw)
+        self.decode_stats["loop_seconds_saved"] += elapsed
+        _LOGGER.debug(
+            "Decoded %d bytes in executor, saved %.1f ms on the event loop "
+            "(%.1f ms total)",
+            len(raw),
+            elapsed * 1000,
+            self.decode_stats["loop_seconds_saved"] * 1000,
+        )
+        return result, elapsed
+
+    async def _async_request(
+        self,
+        endpoint: str,
+        url: str,
+        description: str,
+        headers: Optional[Dict[str, str]] = None,
+        normalizer: Optional[Callable[[Any], Any]] = None,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> Any:
+        """Fetch an endpoint and decode its JSON body.
+
+        Raises CircuitOpenError without touching the network while the
+        endpoint's breaker is open.
+        """
+        breaker = self.breaker(endpoint)
+        breaker.before_request()
+        start = self._last_request[endpoint] = time.monotonic()
         try:
-            async with self._session.get(API_TICKER_URL, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                response.raise_for_status()
-                return await response.json()
+            raw = await self._transport.async_fetch(endpoint, url, headers, params)
         except aiohttp.ClientError as err:
-            _LOGGER.error("Error fetching ticker data: %s", err)
+            # Nur debug: der Breaker meldet anhaltende Störungen einmalig
+            _LOGGER.debug("Error fetching %s: %s", description, err)
+            breaker.record_failure(err)
             raise
         except asyncio.TimeoutError as err:
-            _LOGGER.error("Timeout fetching ticker data: %s", err)
+            _LOGGER.debug("Timeout fetching %s: %s", description, err)
+            breaker.record_failure(err)
             raise
+        except BaseException:
+            # Abbruch oder unerwarteter Fehler (z.B. geschlossene Session): kein
+            # Urteil über die API, aber eine laufende Probe muss freigegeben werden
+            breaker.release_probe()
+            raise
+        breaker.record_success()
+        fetched = time.monotonic()
+        result, decode_seconds = await self._async_decode(raw, normalizer)
+
+        stats = self.request_stats.setdefault(
+            endpoint,
+            {"count": 0, "bytes": 0, "fetch_seconds": 0.0, "decode_seconds": 0.0},
+        )
+        stats["count"] += 1
+        stats["bytes"] += len(raw)
+        stats["fetch_seconds"] += fetched - start
+        stats["decode_seconds"] += decode_seconds
+        return result
 
-    async def async_get_asset_wallets(self) -> Dict[str, Any]:
+    async def async_get_ticker(self) -> Dict[str, Any]:
+        """Get price ticker data."""
+        return await self._async_request(
+            ENDPOINT_TICKER, API_TICKER_URL, "ticker data"
+        )
+
+    async def async_get_asset_wallets(
+        self, normalizer: Optional[Callable[[Any], Any]] = None
+    ) -> Dict[str, Any]:
         """Get asset wallets."""
-        try:
-            url = f"{API_BASE_URL}/asset-wallets"
-            async with self._session.get(
-                url, headers=self._headers, timeout=aiohttp.ClientTimeout(total=10)
-            ) as response:
-                response.raise_for_status()
-                return await response.json()
-        except aiohttp.ClientError as err:
-            _LOGGER.error("Error fetching asset wallets: %s", err)
-            raise
-        except asyncio.TimeoutError as err:
-            _LOGGER.error("Timeout fetching asset wallets: %s", err)
-            raise
+        return await self._async_request(
+            ENDPOINT_ASSET_WALLETS,
+            f"{API_BASE_URL}/asset-wallets", "asset wallets", self._headers, normalizer
+        )
 
-    async def async_get_fiat_wallets(self) -> Dict[str, Any]:
+    async def async_get_fiat_wallets(
+        self, normalizer: Optional[Callable[[Any], Any]] = None
+    ) -> Dict[str, Any]:
         """Get fiat wallets."""
-        try:
-            url = f"{API_BASE_URL}/fiatwallets"
-            async with self._session.get(
-                url, headers=self._headers, timeout=aiohttp.ClientTimeout(total=10)
-            ) as response:
-                response.raise_for_status()
-                return await response.json()
-        except aiohttp.ClientError as err:
-            _LOGGER.error("Error fetching fiat wallets: %s", err)
-            raise
-        except asyncio.TimeoutError as err:
-            _LOGGER.error("Timeout fetching fiat wallets: %s", err)
-            raise
+        return await self._async_request(
+            ENDPOINT_FIAT_WALLETS,
+            f"{API_BASE_URL}/fiatwallets", "fiat wallets", self._headers, normalizer
+        )
 
     async def async_get_crypto_wallets(self) -> Dict[str, Any]:
         """Get crypto wallets."""
-        try:
-            url = f"{API_BASE_URL}/wallets"
-            async with self._session.get(
-                url, headers=self._headers, timeout=aiohttp.ClientTimeout(total=10)
-            ) as response:
-                response.raise_for_status()
-                return await response.json()
-        except aiohttp.ClientError as err:
-            _LOGGER.error("Error fetching crypto wallets: %s", err)
-            raise
-        except asyncio.TimeoutError as err:
-            _LOGGER.error("Timeout fetching crypto wallets: %s", err)
-            raise
+        return await self._async_request(
+            ENDPOINT_CRYPTO_WALLETS,
+            f"{API_BASE_URL}/wallets", "crypto wallets", self._headers
+        )
+
+    async def async_get_crypto_transactions(
+        self, cursor: Optional[str] = None, page_size: int = 25
+    ) -> Dict[str, Any]:
+        """Get one page of crypto wallet transactions, newest first."""
+        params: Dict[str, Any] = {"page_size": page_size}
+        if cursor:
+            params["cursor"] = cursor
+        return await self._async_request(
+            ENDPOINT_CRYPTO_TRANSACTIONS,
+            f"{API_BASE_URL}/wallets/transactions",
+            "crypto transactions",
+            self._headers,
+            params=params,
+        )
+
+    async def async_get_trades(
+        self, cursor: Optional[str] = None, page_size: int = 25
+    ) -> Dict[str, Any]:
+        """Get one page of trades, newest first."""
+        params: Dict[str, Any] = {"page_size": page_size}
+        if cursor:
+            params["cursor"] = cursor
+        return await self._async_request(
+            ENDPOINT_TRADES,
+            f"{API_BASE_URL}/trades",
+            "trades",
+            self._headers,
+            params=params,
+        )
 
     async def async_test_connection(self) -> bool:
         """Test the API connection."""
@@ -0,0 +1,166 @@
+"""Circuit breaker and stale-data serving for the Bitpanda API."""
+import asyncio
+from datetime import datetime, timedelta
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import aiohttp
+from homeassistant.helpers.update_coordinator import UpdateFailed
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_MAX_RECOVERY_TIMEOUT,
+    BREAKER_RECOVERY_TIMEOUT,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+STATE_CLOSED = "closed"
+STATE_HALF_OPEN = "half_open"
+STATE_OPEN = "open"
+BREAKER_STATES = [STATE_CLOSED, STATE_HALF_OPEN, STATE_OPEN]
+
+
+class CircuitOpenError(Exception):
+    """Raised when a request is short-circuited by an open breaker."""
+
+
+def is_degradation(err: Exception) -> bool:
+    """Return True if an error means the API is unhealthy, not the request."""
+    if isinstance(err, aiohttp.ClientResponseError):
+        return (err.status or 0) >= 500 or err.status == 429
+    return isinstance(err, (aiohttp.ClientError, asyncio.TimeoutError))
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker for a single endpoint."""
+
+    def __init__(self, name: str) -> None:
+        """Initialize the breaker."""
+        self.name = name
+        self.state = STATE_CLOSED
+        self.failures = 0
+        self.opened_at: Optional[datetime] = None
+        self._recovery_timeout = BREAKER_RECOVERY_TIMEOUT.total_seconds()
+        self._next_probe = 0.0
+        self._probe_in_flight = False
+
+    def before_request(self) -> None:
+        """Raise CircuitOpenError unless a request may be sent now."""
+        if self.state == STATE_CLOSED:
+            return
+        if (
+            self.state == STATE_OPEN
+            and not self._probe_in_flight
+            and time.monotonic() >= self._next_probe
+        ):
+            # Genau eine Probe-Anfrage durchlassen
+            self.state = STATE_HALF_OPEN
+            self._probe_in_flight = True
+            return
+        raise CircuitOpenError(f"Circuit for {self.name} is {self.state}")
+
+    def record_success(self) -> None:
+        """Close the breaker after a successful request."""
+        if self.state != STATE_CLOSED:
+            _LOGGER.info("Bitpanda %s requests are working again", self.name)
+        self.state = STATE_CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._probe_in_flight = False
+        self._recovery_timeout = BREAKER_RECOVERY_TIMEOUT.total_seconds()
+
+    def record_failure(self, err: Exception) -> None:
+        """Count a failure and open the breaker if needed."""
+        if not is_degradation(err):
+            # Fehler wie 401/403 sagen nichts über die Verfügbarkeit der API aus:
+            # Probe freigeben, ohne eine Erholung zu melden
+            self.release_probe()
+            return
+
+        self.failures += 1
+        if self.state == STATE_HALF_OPEN:
+            # Probe fehlgeschlagen: Wartezeit bis zur nächsten Probe verdoppeln
+            self._recovery_timeout = min(
+                self._recovery_timeout * 2,
+                BREAKER_MAX_RECOVERY_TIMEOUT.total_seconds(),
+            )
+            self._open()
+        elif (
+            self.state == STATE_CLOSED
+            and self.failures >= BREAKER_FAILURE_THRESHOLD
+        ):
+            _LOGGER.warning(
+                "Bitpanda %s requests failed %d times, pausing them: %s",
+                self.name,
+                self.failures,
+                err,
+            )
+            self.opened_at = dt_util.utcnow()
+            self._open()
+
+    def release_probe(self) -> None:
+        """Allow a new probe after the probe request gave no verdict."""
+        if self.state == STATE_HALF_OPEN:
+            self.state = STATE_OPEN
+            self._probe_in_flight = False
+            self._next_probe = time.monotonic()
+
+    def _open(self) -> None:
+        """Open the breaker until the next probe is due."""
+        self.state = STATE_OPEN
+        self._probe_in_flight = False
+        self._next_probe = time.monotonic() + self._recovery_timeout
+
+
+class StaleDataGuard:
+    """Serve the last good coordinator data while the API is failing."""
+
+    def __init__(self, max_staleness: timedelta) -> None:
+        """Initialize the guard."""
+        self._max_staleness = max_staleness
+        self._last_success: Dict[str, datetime] = {}
+        self._last_data: Dict[str, Any] = {}
+        self.stale: Dict[str, bool] = {}
+
+    async def async_fetch(
+        self, key: str, fetch: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Fetch fresh data or fall back to data within the staleness bound.
+
+        Only an open circuit or an API degradation serves cached data; other
+        errors such as 401/403 fail the update right away.
+        """
+        try:
+            data = await fetch()
+        except Exception as err:
+            if not isinstance(err, CircuitOpenError) and not is_degradation(err):
+                raise UpdateFailed(f"Error communicating with API: {err}") from err
+            last_success = self._last_success.get(key)
+            if (
+                last_success is not None
+                and dt_util.utcnow() - last_success <= self._max_staleness
+            ):
+                if not self.stale.get(key):
+                    _LOGGER.debug("Serving cached %s data: %s", key, err)
+                self.stale[key] = True
+                return self._last_data[key]
+            raise UpdateFailed(f"Error communicating with API: {err}") from err
+
+        self._last_success[key] = dt_util.utcnow()
+        self._last_data[key] = data
+        self.stale[key] = False
+        return data
+
+    def freshness_attributes(self, key: str) -> Dict[str, Any]:
+        """Return age attributes while stale data is served, else an empty dict."""
+        if not self.stale.get(key):
+            return {}
+        last_success = self._last_success[key]
+        return {
+            "stale": True,
+            "data_age": int((dt_util.utcnow() - last_success).total_seconds()),
+            "last_success": last_success.isoformat(),
+        }
@@ -0,0 +1,289 @@
+"""Record/replay transports for Bitpanda API traffic."""
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+from multidict import CIMultiDict, CIMultiDictProxy
+from yarl import URL
+
+from .const import CASSETTE_MAX_BYTES, CASSETTE_MAX_INTERACTIONS
+from .payload import json_loads
+
+_LOGGER = logging.getLogger(__name__)
+
+CASSETTE_VERSION = 1
+
+# Fehlerklassen, die beim Abspielen als Verbindungsfehler nachgestellt werden
+ERROR_TIMEOUT = "timeout"
+
+# Felder mit personenbezogenen Daten, die nicht in Cassettes landen dürfen
+SENSITIVE_KEYS = {
+    "id",
+    "user_id",
+    "wallet_id",
+    "fiat_wallet_id",
+    "trade_id",
+    "transaction_id",
+    "related_wallet_id",
+    "related_wallet_transaction_id",
+    "payment_option_id",
+    "bfc_trade_id",
+    "recipient",
+    "address",
+    "email",
+    "iban",
+    "name",
+    "tx_id",
+}
+
+
+class AiohttpTransport:
+    """Fetch raw response bodies with an aiohttp session."""
+
+    def __init__(self, session: aiohttp.ClientSession) -> None:
+        """Initialize the transport."""
+        self._session = session
+
+    async def async_fetch(
+        self,
+        endpoint: str,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> bytes:
+        """Fetch a URL and return the raw body."""
+        async with self._session.get(
+            url,
+            headers=headers,
+            params=params,
+            timeout=aiohttp.ClientTimeout(total=10),
+        ) as response:
+            response.raise_for_status()
+            return await response.read()
+
+
+class _Sanitizer:
+    """Replace identifying values with stable placeholders."""
+
+    def __init__(self) -> None:
+        """Initialize the sanitizer."""
+        self._placeholders: Dict[str, str] = {}
+
+    def placeholder(self, value: Any) -> str:
+        """Return the placeholder for a sensitive value."""
+        key = str(value)
+        if key not in self._placeholders:
+            self._placeholders[key] = f"redacted-{len(self._placeholders) + 1}"
+        return self._placeholders[key]
+
+    def sanitize(self, data: Any) -> Any:
+        """Sanitize a decoded payload recursively."""
+        if isinstance(data, dict):
+            return {
+                key: (
+                    self.placeholder(value)
+                    if key in SENSITIVE_KEYS and isinstance(value, (str, int))
+                    else self.sanitize(value)
+                )
+                for key, value in data.items()
+            }
+        if isinstance(data, list):
+            return [self.sanitize(item) for item in data]
+        return data
+
+
+class RecordingTransport:
+    """Wrap a transport and capture every response with its timing.
+
+    Recording stops silently after ``max_interactions`` responses or
+    ``max_bytes`` of bodies; requests still pass through.
+    """
+
+    def __init__(
+        self,
+        inner,
+        max_interactions: int = CASSETTE_MAX_INTERACTIONS,
+        max_bytes: int = CASSETTE_MAX_BYTES,
+    ) -> None:
+        """Initialize the recorder."""
+        self.inner = inner
+        self._started = time.monotonic()
+        self._interactions: List[Dict[str, Any]] = []
+        self._max_interactions = max_interactions
+        self._max_bytes = max_bytes
+        self._bytes = 0
+        self.truncated = False
+
+    async def async_fetch(
+        self,
+        endpoint: str,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> bytes:
+        """Fetch through the inner transport and record the outcome."""
+        if self.truncated:
+            return await self.inner.async_fetch(endpoint, url, headers, params)
+        start = time.monotonic()
+        interaction: Dict[str, Any] = {
+            "endpoint": endpoint,
+            "params": params or {},
+            "offset": round(start - self._started, 3),
+        }
+        # Abgebrochene Anfragen haben kein Ergebnis und werden nicht aufgezeichnet
+        try:
+            raw = await self.inner.async_fetch(endpoint, url, headers, params)
+        except aiohttp.ClientResponseError as err:
+            interaction["status"] = err.status
+            interaction["error"] = type(err).__name__
+            self._record(interaction, start)
+            raise
+        except aiohttp.ClientError as err:
+            interaction["status"] = None
+            interaction["error"] = type(err).__name__
+            self._record(interaction, start)
+            raise
+        except asyncio.TimeoutError:
+            interaction["status"] = None
+            interaction["error"] = ERROR_TIMEOUT
+            self._record(interaction, start)
+            raise
+        interaction["status"] = 200
+        interaction["body"] = raw
+        self._bytes += len(raw)
+        self._record(interaction, start)
+        return raw
+
+    def _record(self, interaction: Dict[str, Any], start: float) -> None:
+        """Keep an interaction unless the recording limits are reached."""
+        interaction["elapsed"] = round(time.monotonic() - start, 3)
+        self._interactions.append(interaction)
+        if (
+            len(self._interactions) >= self._max_interactions
+            or self._bytes >= self._max_bytes
+        ):
+            self.truncated = True
+            _LOGGER.warning(
+                "Recording limit reached after %d interactions (%d bytes), "
+                "further Bitpanda API traffic is not recorded",
+                len(self._interactions),
+                self._bytes,
+            )
+
+    def save(self, path: str) -> int:
+        """Sanitize the recorded traffic and write it as a cassette.
+
+        Decodes every body, so it should run in an executor.
+        """
+        sanitizer = _Sanitizer()
+        interactions = []
+        for interaction in self._interactions:
+            interaction = dict(interaction)
+            if "body" in interaction:
+                interaction["body"] = sanitizer.sanitize(json_loads(interaction["body"]))
+            interactions.append(interaction)
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "version": CASSETTE_VERSION,
+                    "truncated": self.truncated,
+                    "interactions": interactions,
+                },
+                file,
+                indent=1,
+            )
+        return len(interactions)
+
+
+def _interaction_key(endpoint: str, params: Optional[Dict[str, Any]]) -> str:
+    """Return the replay key of a request: endpoint plus its query parameters."""
+    return f"{endpoint} {json.dumps(params or {}, sort_keys=True)}"
+
+
+class ReplayTransport:
+    """Serve recorded responses per request, in recorded order.
+
+    Requests are matched on endpoint and query parameters, so paginated
+    requests get the page of their cursor.
+    """
+
+    def __init__(
+        self,
+        interactions: List[Dict[str, Any]],
+        speed: Optional[float] = 1.0,
+        loop: bool = True,
+    ) -> None:
+        """Initialize the replay transport.
+
+        ``speed`` scales the recorded latency (``2.0`` is twice as fast);
+        ``None`` or ``0`` replays without any delay.
+        """
+        self._speed = speed
+        self._loop = loop
+        self._queues: Dict[str, List[Dict[str, Any]]] = {}
+        self._positions: Dict[str, int] = {}
+        for interaction in interactions:
+            interaction = dict(interaction)
+            # Einmal kodieren, damit die Dekodierkosten wie im Livebetrieb anfallen
+            if "body" in interaction:
+                interaction["body"] = json.dumps(interaction["body"]).encode()
+            key = _interaction_key(interaction["endpoint"], interaction.get("params"))
+            self._queues.setdefault(key, []).append(interaction)
+
+    @classmethod
+    def from_file(
+        cls, path: str, speed: Optional[float] = 1.0, loop: bool = True
+    ) -> "ReplayTransport":
+        """Load a cassette file (blocking I/O)."""
+        with open(path, encoding="utf-8") as file:
+            cassette = json.load(file)
+        if cassette.get("version") != CASSETTE_VERSION:
+            raise ValueError(f"Unsupported cassette version: {cassette.get('version')}")
+        return cls(cassette["interactions"], speed, loop)
+
+    async def async_fetch(
+        self,
+        endpoint: str,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> bytes:
+        """Return the next recorded response for the request."""
+        key = _interaction_key(endpoint, params)
+        queue = self._queues.get(key)
+        if not queue:
+            raise aiohttp.ClientError(f"No recorded interaction for {key}")
+        position = self._positions.get(key, 0)
+        if position >= len(queue):
+            if not self._loop:
+                raise aiohttp.ClientError(f"Cassette exhausted for {key}")
+            position = 0
+        self._positions[key] = position + 1
+        interaction = queue[position]
+
+        if self._speed:
+            await asyncio.sleep(interaction["elapsed"] / self._speed)
+        if "body" in interaction:
+            return interaction["body"]
+        if interaction.get("error") == ERROR_TIMEOUT or interaction.get("timeout"):
+            raise asyncio.TimeoutError(f"Recorded timeout for {endpoint}")
+        if interaction.get("status"):
+            # Mit echter RequestInfo, damit str(err) wie im Livebetrieb funktioniert
+            request_url = URL(url)
+            raise aiohttp.ClientResponseError(
+                aiohttp.RequestInfo(
+                    request_url, "GET", CIMultiDictProxy(CIMultiDict()), request_url
+                ),
+                (),
+                status=interaction["status"],
+                message=f"Recorded error for {endpoint}",
+            )
+        raise aiohttp.ClientConnectionError(
+            f"Recorded {interaction.get('error', 'error')} for {endpoint}"
+        )
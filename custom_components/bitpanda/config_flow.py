@@ -5,18 +5,28 @@ from homeassistant import config_entries
 from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
-from homeassistant.helpers.selector import SelectSelector, SelectSelectorConfig
+from homeassistant.helpers.selector import (
+    NumberSelector,
+    NumberSelectorConfig,
+    SelectSelector,
+    SelectSelectorConfig,
+)
 import homeassistant.helpers.config_validation as cv
 
 from .api import BitpandaApiClient
 from .const import (
     CONF_API_KEY,
     CONF_CURRENCY,
+    CONF_JSON_EXECUTOR_THRESHOLD,
+    CONF_MAX_STALENESS,
     CONF_TRACKED_ASSETS,
     CONF_TRACKED_WALLETS,
     DEFAULT_CURRENCY,
+    DEFAULT_MAX_STALENESS,
+    JSON_EXECUTOR_THRESHOLD,
     DOMAIN,
 )
+from .payload import normalize_asset_wallets, normalize_fiat_wallets
 
 import logging
 
@@ -125,10 +135,60 @@ class BitpandaOptionsFlowHandler(config_entries.OptionsFlow):
         self, user_input: Optional[Dict[str, Any]] = None
     ) -> FlowResult:
         """Manage the options."""
-        # GEÄNDERT: Nur noch Price Tracker und Wallets, keine Settings mehr
         return self.async_show_menu(
             step_id="init",
-            menu_options=["price_tracker", "wallets"],
+            menu_options=["price_tracker", "wallets", "settings"],
+        )
+
+    async def async_step_settings(
+        self, user_input: Optional[Dict[str, Any]] = None
+    ) -> FlowResult:
+        """Handle advanced settings."""
+        if user_input is not None:
+            new_options = {**self.config_entry.options}
+            new_options[CONF_MAX_STALENESS] = int(user_input[CONF_MAX_STALENESS])
+            new_options[CONF_JSON_EXECUTOR_THRESHOLD] = int(
+                user_input[CONF_JSON_EXECUTOR_THRESHOLD]
+            )
+            return self.async_create_entry(title="", data=new_options)
+
+        current_staleness = self.config_entry.options.get(
+            CONF_MAX_STALENESS, DEFAULT_MAX_STALENESS
+        )
+        current_threshold = self.config_entry.options.get(
+            CONF_JSON_EXECUTOR_THRESHOLD, JSON_EXECUTOR_THRESHOLD // 1024
+        )
+
+        return self.async_show_form(
+            step_id="settings",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(
+                        CONF_MAX_STALENESS,
+                        default=current_staleness,
+                    ): NumberSelector(
+                        NumberSelectorConfig(
+                            min=0,
+                            max=1440,
+                            step=5,
+                            unit_of_measurement="min",
+                            mode="box",
+                        )
+                    ),
+                    vol.Required(
+                        CONF_JSON_EXECUTOR_THRESHOLD,
+                        default=current_threshold,
+                    ): NumberSelector(
+                        NumberSelectorConfig(
+                            min=0,
+                            max=10240,
+                            step=1,
+                            unit_of_measurement="KB",
+                            mode="box",
+                        )
+                    ),
+                }
+            ),
         )
 
     async def async_step_price_tracker(
@@ -187,76 +247,40 @@ class BitpandaOptionsFlowHandler(config_entries.OptionsFlow):
         client = BitpandaApiClient(api_key, session)
 
         wallet_options = []
-        
-        def process_wallet_collection(parent_category, sub_category, wallets_data):
-            """Process a collection of wallets."""
-            if not isinstance(wallets_data, list):
-                return
-                
-            for wallet in wallets_data:
-                if "attributes" not in wallet:
-                    continue
-                    
-                # Alle Wallet-Typen verwenden cryptocoin_symbol
-                symbol = wallet["attributes"].get("cryptocoin_symbol", "")
-                
-                if symbol:
-                    # Erstelle einen eindeutigen Pfad für die Kategorie
-                    full_category = f"{parent_category}_{sub_category}" if sub_category else parent_category
-                    
-                    # Bestimme das Label basierend auf der Kategorie
-                    if parent_category == "commodity" and sub_category == "metal":
-                        # Spezielle Labels für Metals
-                        metal_names = {
-                            "XAU": "Gold (XAU)",
-                            "XAG": "Silver (XAG)",
-                            "XPT": "Platinum (XPT)",
-                            "XPD": "Palladium (XPD)",
-                        }
-                        label = f"Metal: {metal_names.get(symbol, symbol)}"
-                    elif parent_category == "index":
-                        label = f"Index: {symbol}"
-                    elif parent_category == "cryptocoin":
-                        label = f"Crypto: {symbol}"
-                    else:
-                        label = f"{parent_category.title()}: {symbol}"
-                    
-                    wallet_options.append({
-                        "value": f"{full_category}_{symbol}",
-                        "label": label
-                    })
-        
+
+        # Spezielle Labels für Metals
+        metal_names = {
+            "XAU": "Gold (XAU)",
+            "XAG": "Silver (XAG)",
+            "XPT": "Platinum (XPT)",
+            "XPD": "Palladium (XPD)",
+        }
+
+        def wallet_label(wallet):
+            """Build the label for a normalized wallet entry."""
+            parent_category = wallet["parent_category"]
+            symbol = wallet["symbol"]
+            if parent_category == "commodity" and wallet["sub_category"] == "metal":
+                return f"Metal: {metal_names.get(symbol, symbol)}"
+            if parent_category == "index":
+                return f"Index: {symbol}"
+            if parent_category == "cryptocoin":
+                return f"Crypto: {symbol}"
+            if parent_category == "fiat":
+                return f"Fiat: {symbol}"
+            return f"{parent_category.title()}: {symbol}"
+
         try:
-            asset_wallets = await client.async_get_asset_wallets()
-            
-            if "data" in asset_wallets and "attributes" in asset_wallets["data"]:
-                for category, data in asset_wallets["data"]["attributes"].items():
-                    # Ignoriere Security-Kategorie (keine Preise verfügbar)
-                    if category == "security" or category == "equity_security":
-                        _LOGGER.debug(f"Skipping category: {category} (no prices available)")
-                        continue
-                    
-                    # Direktes wallets array (z.B. cryptocoin)
-                    if isinstance(data, dict) and "attributes" in data and "wallets" in data["attributes"]:
-                        process_wallet_collection(category, None, data["attributes"]["wallets"])
-                    
-                    # Verschachtelte Struktur (z.B. commodity.metal, index.index)
-                    elif isinstance(data, dict):
-                        for sub_category, sub_data in data.items():
-                            if isinstance(sub_data, dict) and "attributes" in sub_data and "wallets" in sub_data["attributes"]:
-                                process_wallet_collection(category, sub_category, sub_data["attributes"]["wallets"])
-            
-            # Fiat wallets
-            fiat_wallets = await client.async_get_fiat_wallets()
-            if "data" in fiat_wallets:
-                for wallet in fiat_wallets["data"]:
-                    symbol = wallet["attributes"].get("fiat_symbol", "")
-                    if symbol:
-                        wallet_options.append({
-                            "value": f"fiat_{symbol}",
-                            "label": f"Fiat: {symbol}"
-                        })
-                        
+            # Dekodierung und Normalisierung laufen bei großen Antworten im Executor
+            asset_wallets = await client.async_get_asset_wallets(normalize_asset_wallets)
+            fiat_wallets = await client.async_get_fiat_wallets(normalize_fiat_wallets)
+
+            for wallet_id, wallet in {**asset_wallets, **fiat_wallets}.items():
+                wallet_options.append({
+                    "value": wallet_id,
+                    "label": wallet_label(wallet),
+                })
+
         except Exception as err:
             _LOGGER.error("Error fetching wallets: %s", err, exc_info=True)
 
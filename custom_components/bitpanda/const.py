@@ -6,6 +6,8 @@ CONF_API_KEY = "api_key"
 CONF_CURRENCY = "currency"
 CONF_TRACKED_ASSETS = "tracked_assets"
 CONF_TRACKED_WALLETS = "tracked_wallets"
+CONF_MAX_STALENESS = "max_staleness"
+CONF_JSON_EXECUTOR_THRESHOLD = "json_executor_threshold"
 
 # API URLs
 API_BASE_URL = "https://api.bitpanda.com/v1"
@@ -15,6 +17,38 @@ API_TICKER_URL = "https://api.bitpanda.com/v1/ticker"
 PRICE_UPDATE_INTERVAL = timedelta(seconds=60)
 WALLET_UPDATE_INTERVAL = timedelta(minutes=5)
 
+# JSON-Antworten ab dieser Größe (Bytes) werden im Executor dekodiert,
+# in den Optionen in KB einstellbar
+JSON_EXECUTOR_THRESHOLD = 64 * 1024
+
+# Rate-Budget: Mindestabstand zwischen zwei Anfragen an denselben Endpoint
+MIN_REQUEST_INTERVAL = timedelta(seconds=10)
+
+# Circuit Breaker: nach so vielen Fehlern in Folge wird ein Endpoint pausiert
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_RECOVERY_TIMEOUT = timedelta(minutes=1)
+BREAKER_MAX_RECOVERY_TIMEOUT = timedelta(minutes=15)
+# Wie lange (Minuten) die letzten guten Daten bei einer Störung weiter geliefert werden
+DEFAULT_MAX_STALENESS = 60
+
+# Services
+SERVICE_REFRESH = "refresh"
+ATTR_TARGET = "target"
+REFRESH_TARGET_PRICES = "prices"
+REFRESH_TARGET_WALLETS = "wallets"
+REFRESH_TARGET_ALL = "all"
+REFRESH_TARGETS = [REFRESH_TARGET_ALL, REFRESH_TARGET_PRICES, REFRESH_TARGET_WALLETS]
+SERVICE_START_RECORDING = "start_recording"
+SERVICE_STOP_RECORDING = "stop_recording"
+ATTR_CASSETTE = "cassette"
+# Unterordner im Konfigurationsverzeichnis für aufgezeichnete Cassettes
+CASSETTE_DIR = "bitpanda_cassettes"
+# Obergrenzen einer Aufzeichnung, danach wird nur noch durchgereicht
+CASSETTE_MAX_INTERACTIONS = 2000
+CASSETTE_MAX_BYTES = 20 * 1024 * 1024
+# Aufrufe innerhalb dieses Fensters werden zu einem Abruf zusammengefasst
+REFRESH_DEBOUNCE_COOLDOWN = 2.0
+
 # Asset categories
 ASSET_CATEGORIES = {
     "cryptocoin": "Crypto",
@@ -33,7 +67,34 @@ WALLET_GROUPING_CATEGORY = "category"
 DEFAULT_CURRENCY = "EUR"
 DEFAULT_WALLET_GROUPING = WALLET_GROUPING_CATEGORY
 
+# Portfolio-Performance (zeitgewichtete Rendite)
+PERFORMANCE_STORAGE_VERSION = 1
+# Laufender Tag wird praktisch nur beim Beenden von Home Assistant geschrieben
+PERFORMANCE_TODAY_SAVE_DELAY = 6 * 60 * 60
+RETURN_PERIOD_DAY = "day"
+RETURN_PERIOD_WEEK = "week"
+RETURN_PERIOD_MONTH = "month"
+RETURN_PERIOD_YTD = "ytd"
+RETURN_PERIODS = {
+    RETURN_PERIOD_DAY: "Daily",
+    RETURN_PERIOD_WEEK: "Weekly",
+    RETURN_PERIOD_MONTH: "Monthly",
+    RETURN_PERIOD_YTD: "YTD",
+}
+
+# Staking-Rewards und Sparpläne (inkrementeller, paginierter Sync)
+ACTIVITY_STORAGE_VERSION = 1
+ACTIVITY_SAVE_DELAY = 60
+# Kleine Seite für den Normalbetrieb, größere zum Nachladen der Historie
+ACTIVITY_PAGE_SIZE = 10
+ACTIVITY_BACKFILL_PAGE_SIZE = 100
+ACTIVITY_MAX_BACKFILL_PAGES = 5
+
 # Sensor types
 SENSOR_TYPE_PRICE = "price"
 SENSOR_TYPE_WALLET = "wallet"
 SENSOR_TYPE_WALLET_TOTAL = "wallet_total"
+SENSOR_TYPE_PORTFOLIO_RETURN = "portfolio_return"
+SENSOR_TYPE_STAKING_REWARDS = "staking_rewards"
+SENSOR_TYPE_SAVINGS_PLAN = "savings_plan"
+SENSOR_TYPE_API_STATUS = "api_status"
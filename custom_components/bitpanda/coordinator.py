@@ -0,0 +1,69 @@
+"""Update methods of the Bitpanda coordinators."""
+from typing import Any, Dict, Optional
+
+from .activity import ActivitySync
+from .api import BitpandaApiClient
+from .breaker import StaleDataGuard
+from .payload import normalize_asset_wallets, normalize_fiat_wallets
+from .performance import PortfolioPerformanceTracker
+
+
+class BitpandaDataUpdater:
+    """Fetch the coordinator data and update the derived statistics.
+
+    Kept apart from the coordinators so a client with a ``ReplayTransport``
+    can drive the same code path offline, e.g. to measure update latency.
+    """
+
+    def __init__(
+        self,
+        client: BitpandaApiClient,
+        stale_guard: StaleDataGuard,
+        performance_tracker: Optional[PortfolioPerformanceTracker] = None,
+        activity: Optional[ActivitySync] = None,
+    ) -> None:
+        """Initialize the updater."""
+        self._client = client
+        self._stale_guard = stale_guard
+        self._performance_tracker = performance_tracker
+        self._activity = activity
+
+    async def async_update_prices(self) -> Dict[str, Any]:
+        """Fetch price data from API."""
+        return await self._stale_guard.async_fetch(
+            "prices", self._client.async_get_ticker
+        )
+
+    async def async_fetch_wallets(self) -> Dict[str, Any]:
+        """Fetch wallet data from API."""
+        asset_wallets = await self._client.async_get_asset_wallets(
+            normalize_asset_wallets
+        )
+        fiat_wallets = await self._client.async_get_fiat_wallets(normalize_fiat_wallets)
+        crypto_wallets = await self._client.async_get_crypto_wallets()
+        return {
+            "asset_wallets": asset_wallets,
+            "fiat_wallets": fiat_wallets,
+            "crypto_wallets": crypto_wallets,
+        }
+
+    async def async_update_wallets(
+        self, ticker: Optional[Dict[str, Any]], backfill: bool = True
+    ) -> Dict[str, Any]:
+        """Fetch wallet data and update derived statistics.
+
+        ``ticker`` is the current price data used to value the wallets;
+        ``backfill`` is passed on to the activity sync.
+        """
+        data = await self._stale_guard.async_fetch("wallets", self.async_fetch_wallets)
+        if self._stale_guard.stale["wallets"]:
+            return data
+
+        # Staking-Rewards und Sparpläne: im Normalbetrieb eine kleine Seite pro Poll
+        if self._activity is not None:
+            await self._activity.async_sync(data, backfill=backfill)
+        # Tages-Snapshot für die zeitgewichtete Rendite fortschreiben; Trades und
+        # Rewards aus dem Sync oben zählen dabei nicht als Zu-/Abfluss
+        if self._performance_tracker is not None:
+            self._performance_tracker.async_add_snapshot(data, ticker)
+        return data
@@ -0,0 +1,146 @@
+"""JSON decoding and normalization of Bitpanda API payloads."""
+import json
+import logging
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson ships with Home Assistant
+    orjson = None
+
+_LOGGER = logging.getLogger(__name__)
+
+# Kategorien ohne Preise im Ticker
+SKIPPED_CATEGORIES = ("security", "equity_security")
+
+
+def json_loads(raw: bytes) -> Any:
+    """Decode raw JSON bytes with the fastest available backend."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def decode_payload(
+    raw: bytes, normalizer: Optional[Callable[[Any], Any]] = None
+) -> Any:
+    """Decode a response body and optionally normalize it.
+
+    Runs either on the event loop or in an executor, so it must not touch
+    Home Assistant state.
+    """
+    data = json_loads(raw)
+    if normalizer is not None:
+        return normalizer(data)
+    return data
+
+
+def _wallet_entry(parent_category, sub_category, symbol, balance) -> Dict[str, Any]:
+    """Build a normalized wallet entry."""
+    category = f"{parent_category}_{sub_category}" if sub_category else parent_category
+    return {
+        "wallet_id": f"{category}_{symbol}",
+        "category": category,
+        "parent_category": parent_category,
+        "sub_category": sub_category,
+        "symbol": symbol,
+        "balance": balance,
+    }
+
+
+def _wallets_of(data: Any) -> Optional[Any]:
+    """Return ``data["attributes"]["wallets"]`` or None if the shape differs."""
+    if not isinstance(data, dict):
+        return None
+    attributes = data.get("attributes")
+    if not isinstance(attributes, dict):
+        return None
+    return attributes.get("wallets")
+
+
+def normalize_asset_wallets(data: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Flatten the nested asset-wallets response into a wallet_id index."""
+    wallets: Dict[str, Dict[str, Any]] = {}
+
+    def process_wallet_collection(parent_category, sub_category, wallets_data):
+        """Process a collection of wallets."""
+        if not isinstance(wallets_data, list):
+            return
+
+        for wallet in wallets_data:
+            if not isinstance(wallet, dict):
+                continue
+            attributes = wallet.get("attributes")
+            if not isinstance(attributes, dict):
+                continue
+
+            # Alle Wallet-Typen verwenden cryptocoin_symbol
+            symbol = attributes.get("cryptocoin_symbol", "")
+            if not symbol:
+                continue
+
+            entry = _wallet_entry(
+                parent_category,
+                sub_category,
+                symbol,
+                attributes.get("balance"),
+            )
+            # Bei mehreren Wallets desselben Assets gewinnt das erste (wie bisher)
+            wallets.setdefault(entry["wallet_id"], entry)
+
+    if not isinstance(data, dict):
+        return wallets
+    # Fehlerantworten können "data" als Liste oder gar nicht enthalten
+    payload = data.get("data")
+    if not isinstance(payload, dict):
+        return wallets
+    attributes = payload.get("attributes")
+    if not isinstance(attributes, dict):
+        return wallets
+
+    for category, category_data in attributes.items():
+        # Ignoriere Security-Kategorie (keine Preise verfügbar)
+        if category in SKIPPED_CATEGORIES:
+            continue
+        if not isinstance(category_data, dict):
+            continue
+
+        # Direktes wallets array (z.B. cryptocoin)
+        category_wallets = _wallets_of(category_data)
+        if category_wallets is not None:
+            process_wallet_collection(category, None, category_wallets)
+            continue
+
+        # Verschachtelte Struktur (z.B. commodity.metal, index.index)
+        for sub_category, sub_data in category_data.items():
+            sub_wallets = _wallets_of(sub_data)
+            if sub_wallets is not None:
+                process_wallet_collection(category, sub_category, sub_wallets)
+
+    return wallets
+
+
+def normalize_fiat_wallets(data: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Flatten the fiat-wallets response into a wallet_id index."""
+    wallets: Dict[str, Dict[str, Any]] = {}
+    if not isinstance(data, dict):
+        return wallets
+
+    payload = data.get("data")
+    if not isinstance(payload, list):
+        return wallets
+
+    for wallet in payload:
+        if not isinstance(wallet, dict):
+            continue
+        attributes = wallet.get("attributes")
+        if not isinstance(attributes, dict):
+            continue
+        symbol = attributes.get("fiat_symbol", "")
+        if symbol:
+            entry = _wallet_entry("fiat", None, symbol, attributes.get("balance"))
+            # Für die Zuordnung von Trades zu ihrem Fiat-Wallet
+            entry["fiat_id"] = attributes.get("fiat_id")
+            wallets.setdefault(entry["wallet_id"], entry)
+
+    return wallets
@@ -0,0 +1,348 @@
+"""Time-weighted portfolio performance for Bitpanda."""
+from bisect import bisect_right
+from datetime import date
+import logging
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .activity import ActivitySync
+from .const import (
+    DOMAIN,
+    PERFORMANCE_STORAGE_VERSION,
+    PERFORMANCE_TODAY_SAVE_DELAY,
+    RETURN_PERIOD_DAY,
+    RETURN_PERIOD_MONTH,
+    RETURN_PERIOD_WEEK,
+    RETURN_PERIOD_YTD,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Preise werden als ganzzahlige Deltas in dieser Auflösung gespeichert
+PRICE_SCALE = 10**10
+
+
+class WalletSnapshot(NamedTuple):
+    """State of one wallet at the end of a day."""
+
+    balance: float
+    price: float
+    # Wert der ein-/ausgezahlten Menge seit dem letzten Tagesabschluss
+    flow: float
+
+
+def _to_float(value: Any) -> Optional[float]:
+    """Convert an API value to float."""
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def _value(snapshots: Dict[str, WalletSnapshot]) -> float:
+    """Return the total value of a set of wallet snapshots."""
+    return sum(s.balance * s.price for s in snapshots.values())
+
+
+class WalletRows:
+    """Append-only, delta-encoded daily snapshots of one wallet.
+
+    Each row is ``[day_delta, balance, price_delta, flow]``: ``balance`` is
+    ``None`` when unchanged, the price is an integer delta scaled by
+    ``PRICE_SCALE`` and a zero ``flow`` is dropped.
+    """
+
+    def __init__(
+        self, start: Optional[int] = None, rows: Optional[List[list]] = None
+    ) -> None:
+        """Initialize the rows."""
+        self.start = start
+        self.rows: List[list] = rows or []
+        # Stand der letzten Zeile, auf den sich die nächste Zeile bezieht
+        self._day = start
+        self._balance: Optional[float] = None
+        self._price = 0
+        # Gespeicherte Zeilen einmal durchlaufen, um den Stand herzustellen
+        for _ in self._iter_rows():
+            pass
+
+    def _iter_rows(self) -> Iterator[Tuple[int, WalletSnapshot]]:
+        """Decode the rows, advancing the reference state."""
+        self._day = self.start
+        self._balance = None
+        self._price = 0
+        for row in self.rows:
+            self._day += row[0]
+            if row[1] is not None:
+                self._balance = row[1]
+            self._price += row[2]
+            yield self._day, WalletSnapshot(
+                self._balance or 0.0,
+                self._price / PRICE_SCALE,
+                row[3] if len(row) > 3 else 0.0,
+            )
+
+    def decode(self) -> Iterator[Tuple[int, WalletSnapshot]]:
+        """Yield ``(day, snapshot)`` for every stored day."""
+        return self._iter_rows()
+
+    def append(self, day: int, snapshot: WalletSnapshot) -> None:
+        """Append the closing snapshot of a day."""
+        price = round(snapshot.price * PRICE_SCALE)
+        if self.start is None:
+            self.start = self._day = day
+        row = [
+            day - self._day,
+            None if snapshot.balance == self._balance else snapshot.balance,
+            price - self._price,
+        ]
+        if snapshot.flow:
+            row.append(snapshot.flow)
+        self.rows.append(row)
+        self._day = day
+        self._balance = snapshot.balance
+        self._price = price
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the rows as store payload."""
+        return {"start": self.start, "rows": self.rows}
+
+
+def _chain(
+    previous_index: float,
+    last_close_value: float,
+    snapshots: Dict[str, WalletSnapshot],
+) -> float:
+    """Chain a day's return onto the previous closing index."""
+    if last_close_value <= 0:
+        return previous_index
+    flow = sum(s.flow for s in snapshots.values())
+    # Zuflüsse werden am Tagesende angenommen (Modified-Dietz ohne Gewichtung)
+    daily_return = (_value(snapshots) - flow) / last_close_value - 1
+    return previous_index * (1 + daily_return)
+
+
+class PortfolioPerformanceTracker:
+    """Keep daily wallet snapshots and a chain-linked time-weighted index.
+
+    Closed days are stored as delta-encoded rows per wallet and chained into
+    the index once; only the encoded rows stay in memory. The store is
+    written when a day closes, today's snapshot on shutdown.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry_id: str,
+        currency: str,
+        activity: Optional[ActivitySync] = None,
+    ) -> None:
+        """Initialize the tracker.
+
+        ``activity`` provides the balance changes caused by trades and
+        staking rewards, which are not counted as external flows.
+        """
+        self._hass = hass
+        self._currency = currency
+        self._activity = activity
+        self._store: Store = Store(
+            hass,
+            PERFORMANCE_STORAGE_VERSION,
+            f"{DOMAIN}.{entry_id}.performance",
+        )
+        self._rows: Dict[str, WalletRows] = {}
+        # Abgeschlossene Tage: (Tag, Indexstand) und letzter Schlussstand je Wallet
+        self._closes: List[Tuple[int, float]] = []
+        self._last_close: Dict[str, WalletSnapshot] = {}
+        self._last_close_day: Optional[int] = None
+        self._last_close_value = 0.0
+        # Laufender Tag, wird erst beim Tagesabschluss Teil der Indexkette
+        self._today: Dict[str, WalletSnapshot] = {}
+        self._current_day: Optional[int] = None
+        self._current_index: Optional[float] = None
+
+    async def async_load(self) -> None:
+        """Load the stored rows and rebuild the index once."""
+        stored = await self._store.async_load()
+        if not stored:
+            return
+
+        days: Dict[int, Dict[str, WalletSnapshot]] = {}
+        for wallet_id, encoded in stored.get("wallets", {}).items():
+            rows = self._rows[wallet_id] = WalletRows(encoded["start"], encoded["rows"])
+            for day, snapshot in rows.decode():
+                days.setdefault(day, {})[wallet_id] = snapshot
+        for day in sorted(days):
+            self._link_day(day, days[day])
+
+        # Laufenden Tag übernehmen, sofern er nicht schon abgeschlossen ist
+        today = stored.get("today") or {}
+        day = today.get("day")
+        snapshots = {
+            wallet_id: WalletSnapshot(row[0], row[1], row[2] if len(row) > 2 else 0.0)
+            for wallet_id, row in today.get("wallets", {}).items()
+        }
+        if not snapshots or (
+            self._last_close_day is not None and day <= self._last_close_day
+        ):
+            return
+        self._current_day = day
+        self._today = snapshots
+        self._current_index = self._index_for(snapshots)
+
+    def _data_to_save(self) -> Dict[str, Any]:
+        """Return the delta-encoded store payload."""
+        return {
+            "wallets": {
+                wallet_id: rows.as_dict() for wallet_id, rows in self._rows.items()
+            },
+            "today": {
+                "day": self._current_day,
+                "wallets": {
+                    wallet_id: (
+                        [s.balance, s.price, s.flow] if s.flow else [s.balance, s.price]
+                    )
+                    for wallet_id, s in self._today.items()
+                },
+            },
+        }
+
+    def _index_for(self, snapshots: Dict[str, WalletSnapshot]) -> float:
+        """Chain the day's return onto the last closing index."""
+        previous_index = self._closes[-1][1] if self._closes else 1.0
+        return _chain(previous_index, self._last_close_value, snapshots)
+
+    def _link_day(self, day: int, snapshots: Dict[str, WalletSnapshot]) -> None:
+        """Chain a finished day into the index and make it the last close."""
+        self._closes.append((day, self._index_for(snapshots)))
+        self._last_close.update(snapshots)
+        # Leere Wallets nicht weiter mitführen, Zu-/Abflüsse sind verbucht
+        self._last_close = {
+            k: s._replace(flow=0.0) for k, s in self._last_close.items() if s.balance
+        }
+        self._last_close_day = day
+        self._last_close_value = _value(self._last_close)
+
+    def _close_day(self) -> None:
+        """Append the running day to the stored rows and the index chain."""
+        day = self._current_day
+        for wallet_id, snapshot in self._today.items():
+            self._rows.setdefault(wallet_id, WalletRows()).append(day, snapshot)
+        self._link_day(day, self._today)
+        self._today = {}
+        if self._activity is not None:
+            self._activity.prune_movements(day)
+
+    @callback
+    def async_add_snapshot(
+        self,
+        wallet_data: Dict[str, Any],
+        ticker: Optional[Dict[str, Any]],
+    ) -> None:
+        """Record today's snapshot from normalized wallet data and prices."""
+        today = dt_util.now().date().toordinal()
+        closed = False
+        if self._current_day is not None:
+            if today < self._current_day:
+                return
+            if today > self._current_day and self._today:
+                self._close_day()
+                closed = True
+        self._current_day = today
+
+        # Bestandsänderungen durch Trades und Rewards sind keine Zu-/Abflüsse
+        movements: Dict[str, float] = {}
+        if self._activity is not None:
+            movements = self._activity.movements_since(self._last_close_day)
+
+        snapshots: Dict[str, WalletSnapshot] = {}
+        wallets = {
+            **wallet_data.get("asset_wallets", {}),
+            **wallet_data.get("fiat_wallets", {}),
+        }
+        for wallet_id, wallet in wallets.items():
+            balance = _to_float(wallet["balance"])
+            if balance is None:
+                continue
+            if wallet["category"] == "fiat":
+                # Nur Fiat in der Portfolio-Währung ist ohne Wechselkurs bewertbar
+                if wallet["symbol"] != self._currency:
+                    continue
+                price = 1.0
+            else:
+                prices = (ticker or {}).get(wallet["symbol"], {})
+                price = _to_float(prices.get(self._currency))
+                if price is None:
+                    previous = self._last_close.get(wallet_id)
+                    if previous is None:
+                        continue
+                    price = previous.price
+            snapshots[wallet_id] = self._snapshot(
+                wallet_id, balance, price, movements.pop(wallet["symbol"], 0.0)
+            )
+
+        # Verschwundene Wallets als vollständigen Abfluss verbuchen
+        for wallet_id, previous in self._last_close.items():
+            if wallet_id not in snapshots and previous.balance:
+                snapshots[wallet_id] = self._snapshot(wallet_id, 0.0, previous.price)
+
+        if snapshots:
+            self._today = snapshots
+            self._current_index = self._index_for(snapshots)
+        if closed:
+            # Tagesabschluss sofort schreiben; ein verzögertes Speichern würde
+            # vom nächsten Poll immer weiter verschoben
+            self._hass.async_create_task(self._store.async_save(self._data_to_save()))
+        elif snapshots:
+            # Wird bei jedem Poll neu terminiert und damit erst beim Beenden geschrieben
+            self._store.async_delay_save(
+                self._data_to_save, PERFORMANCE_TODAY_SAVE_DELAY
+            )
+
+    def _snapshot(
+        self, wallet_id: str, balance: float, price: float, movement: float = 0.0
+    ) -> WalletSnapshot:
+        """Build a snapshot, valuing the unexplained balance change as flow."""
+        previous = self._last_close.get(wallet_id)
+        previous_balance = previous.balance if previous else 0.0
+        flow = round((balance - previous_balance - movement) * price, 2)
+        return WalletSnapshot(balance, float(f"{price:.8g}"), flow)
+
+    def _index_at(self, day: int) -> Optional[float]:
+        """Return the closing index of the last day on or before ``day``."""
+        if not self._closes:
+            return None
+        position = bisect_right(self._closes, (day, float("inf")))
+        if position == 0:
+            # Historie kürzer als der Zeitraum: ab dem ersten Tag rechnen
+            return 1.0
+        return self._closes[position - 1][1]
+
+    def period_start(self, period: str) -> Optional[date]:
+        """Return the reference day the period return is measured against."""
+        if self._current_day is None:
+            return None
+        if period == RETURN_PERIOD_DAY:
+            day = self._current_day - 1
+        elif period == RETURN_PERIOD_WEEK:
+            day = self._current_day - 7
+        elif period == RETURN_PERIOD_MONTH:
+            day = self._current_day - 30
+        elif period == RETURN_PERIOD_YTD:
+            day = date(date.fromordinal(self._current_day).year, 1, 1).toordinal() - 1
+        else:
+            raise ValueError(f"Unknown return period: {period}")
+        return date.fromordinal(day)
+
+    def period_return(self, period: str) -> Optional[float]:
+        """Return the time-weighted return of a period in percent."""
+        start = self.period_start(period)
+        if start is None or self._current_index is None:
+            return None
+        start_index = self._index_at(start.toordinal())
+        if not start_index:
+            return None
+        return round((self._current_index / start_index - 1) * 100, 2)
@@ -1,23 +1,34 @@
 """Sensor platform for Bitpanda."""
 import logging
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Mapping, Optional
 
 from homeassistant.components.sensor import (
     SensorDeviceClass,
     SensorEntity,
+    SensorStateClass,
 )
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import PERCENTAGE, EntityCategory
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from homeassistant.util import dt as dt_util
 
+from .activity import STREAM_SAVINGS, STREAM_STAKING
+from .breaker import BREAKER_STATES, STATE_CLOSED
 from .const import (
     CONF_TRACKED_ASSETS,
     CONF_TRACKED_WALLETS,
     DOMAIN,
+    RETURN_PERIODS,
+    SENSOR_TYPE_API_STATUS,
+    SENSOR_TYPE_PORTFOLIO_RETURN,
     SENSOR_TYPE_PRICE,
+    SENSOR_TYPE_SAVINGS_PLAN,
+    SENSOR_TYPE_STAKING_REWARDS,
     SENSOR_TYPE_WALLET,
 )
+from .views import SensorViewCache, parse_wallet_id
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -32,47 +43,116 @@ async def async_setup_entry(
     price_coordinator = coordinator_data["price_coordinator"]
     wallet_coordinator = coordinator_data["wallet_coordinator"]
     currency = coordinator_data["currency"]
+    performance_tracker = coordinator_data["performance_tracker"]
+    activity = coordinator_data["activity"]
+    stale_guard = coordinator_data["stale_guard"]
 
     entities = []
+    tracked_assets = config_entry.options.get(CONF_TRACKED_ASSETS, [])
+    tracked_wallets = config_entry.options.get(CONF_TRACKED_WALLETS, [])
+
+    # Gemeinsamer Cache: pro Refresh werden alle Sensor-Werte in einem Durchlauf berechnet
+    views = SensorViewCache(
+        price_coordinator,
+        wallet_coordinator,
+        currency,
+        tracked_assets,
+        tracked_wallets,
+    )
 
     # Add price sensors for tracked assets
-    tracked_assets = config_entry.options.get(CONF_TRACKED_ASSETS, [])
     for asset in tracked_assets:
         entities.append(
             BitpandaPriceSensor(
                 price_coordinator,
                 config_entry,
+                views,
+                stale_guard,
                 asset,
                 currency,
             )
         )
 
     # Add wallet sensors
-    tracked_wallets = config_entry.options.get(CONF_TRACKED_WALLETS, [])
-    
-    if tracked_wallets:
-        for wallet_id in tracked_wallets:
-            entities.append(
-                BitpandaWalletSensor(
-                    wallet_coordinator,
-                    price_coordinator,
-                    config_entry,
-                    wallet_id,
-                    currency,
-                )
+    for wallet_id in tracked_wallets:
+        entities.append(
+            BitpandaWalletSensor(
+                wallet_coordinator,
+                config_entry,
+                views,
+                stale_guard,
+                wallet_id,
+                currency,
             )
+        )
+
+    # Add portfolio return sensors
+    for period in RETURN_PERIODS:
+        entities.append(
+            BitpandaPortfolioReturnSensor(
+                wallet_coordinator,
+                config_entry,
+                performance_tracker,
+                period,
+            )
+        )
+
+    # Add API status diagnostic sensor
+    entities.append(
+        BitpandaApiStatusSensor(
+            price_coordinator,
+            wallet_coordinator,
+            config_entry,
+            coordinator_data["client"],
+            stale_guard,
+        )
+    )
 
     async_add_entities(entities)
 
+    # Staking/Sparplan-Sensoren entstehen, sobald ein Asset den ersten Eintrag hat
+    known_activity: set[tuple[str, str]] = set()
+
+    @callback
+    def async_add_activity_sensors() -> None:
+        """Add sensors for assets with new staking rewards or savings plans."""
+        new_entities = []
+        for stream in (STREAM_STAKING, STREAM_SAVINGS):
+            for symbol in activity.totals(stream):
+                if (stream, symbol) in known_activity:
+                    continue
+                known_activity.add((stream, symbol))
+                new_entities.append(
+                    BitpandaActivitySensor(
+                        wallet_coordinator,
+                        config_entry,
+                        activity,
+                        stream,
+                        symbol,
+                        currency,
+                    )
+                )
+        if new_entities:
+            async_add_entities(new_entities)
+
+    async_add_activity_sensors()
+    config_entry.async_on_unload(
+        wallet_coordinator.async_add_listener(async_add_activity_sensors)
+    )
+
 
 class BitpandaPriceSensor(CoordinatorEntity, SensorEntity):
     """Representation of a Bitpanda price sensor."""
 
     _attr_has_entity_name = True
 
-    def __init__(self, coordinator, config_entry, asset, currency):
+    def __init__(
+        self, coordinator, config_entry, views, stale_guard, asset, currency
+    ):
         """Initialize the sensor."""
         super().__init__(coordinator)
+        self._views = views
+        self._stale_guard = stale_guard
         self._asset = asset
         self._currency = currency
         self._attr_name = f"Bitpanda Price Tracker {asset}/{currency}"
@@ -84,64 +164,23 @@ class BitpandaPriceSensor(CoordinatorEntity, SensorEntity):
     @property
     def native_value(self) -> Optional[float]:
         """Return the state of the sensor."""
-        if self.coordinator.data and self._asset in self.coordinator.data:
-            price_data = self.coordinator.data[self._asset]
-            if self._currency in price_data:
-                try:
-                    return float(price_data[self._currency])
-                except (ValueError, TypeError):
-                    return None
-        return None
+        view = self._views.price(self._asset)
+        return view.value if view else None
 
     @property
     def suggested_display_precision(self) -> int:
         """Return the suggested display precision based on actual decimal places."""
-        value = self.native_value
-        if value is None or value == 0:
-            return 2
-        
-        # Hole den Original-String-Wert aus der API
-        if self.coordinator.data and self._asset in self.coordinator.data:
-            price_data = self.coordinator.data[self._asset]
-            if self._currency in price_data:
-                original_value = str(price_data[self._currency])
-                
-                # Zähle die tatsächlichen Dezimalstellen
-                if '.' in original_value:
-                    decimal_places = len(original_value.split('.')[1])
-                    # Maximal 8 Dezimalstellen für sehr kleine Werte
-                    return min(decimal_places, 8)
-        
-        # Fallback: Berechne basierend auf dem Wertbereich
-        if value >= 1000:
-            return 2
-        elif value >= 10:
-            return 2
-        elif value >= 1:
-            return 4
-        elif value >= 0.1:
-            return 5
-        elif value >= 0.01:
-            return 5
-        elif value >= 0.001:
-            return 6
-        elif value >= 0.0001:
-            return 7
-        else:
-            return 8
+        view = self._views.price(self._asset)
+        return view.precision if view else 2
 
     @property
-    def extra_state_attributes(self) -> Dict[str, Any]:
+    def extra_state_attributes(self) -> Mapping[str, Any]:
         """Return additional attributes."""
-        if self.coordinator.data and self._asset in self.coordinator.data:
-            return {
-                "asset": self._asset,
-                "currency": self._currency,
-                "trading_pair": f"{self._asset}/{self._currency}",
-                "sensor_type": "price_tracker",
-                "all_prices": self.coordinator.data[self._asset],
-            }
-        return {}
+        view = self._views.price(self._asset)
+        attributes = view.attributes if view else {}
+        # Bei Störungen Alter der gelieferten Daten anhängen
+        freshness = self._stale_guard.freshness_attributes("prices")
+        return {**attributes, **freshness} if freshness else attributes
 
 
 class BitpandaWalletSensor(CoordinatorEntity, SensorEntity):
@@ -152,28 +191,20 @@ class BitpandaWalletSensor(CoordinatorEntity, SensorEntity):
     def __init__(
         self,
         wallet_coordinator,
-        price_coordinator,
         config_entry,
+        views,
+        stale_guard,
         wallet_id,
         currency,
     ):
         """Initialize the sensor."""
         super().__init__(wallet_coordinator)
-        self._price_coordinator = price_coordinator
+        self._views = views
+        self._stale_guard = stale_guard
         self._wallet_id = wallet_id
         self._currency = currency
-        
-        # Parse wallet_id (könnte "commodity_metal_XAU" oder "cryptocoin_BTC" sein)
-        parts = wallet_id.split("_")
-        if len(parts) >= 3:
-            # Verschachtelte Kategorie (z.B. commodity_metal_XAU)
-            self._category = f"{parts[0]}_{parts[1]}"
-            self._symbol = "_".join(parts[2:])
-        else:
-            # Einfache Kategorie (z.B. cryptocoin_BTC)
-            self._category = parts[0]
-            self._symbol = "_".join(parts[1:])
-        
+        self._category, self._symbol = parse_wallet_id(wallet_id)
+
         self._attr_name = f"Bitpanda {self._symbol} Wallet"
         self._attr_unique_id = f"{config_entry.entry_id}_wallet_{wallet_id}"
         self._attr_device_class = SensorDeviceClass.MONETARY
@@ -184,94 +215,169 @@ class BitpandaWalletSensor(CoordinatorEntity, SensorEntity):
     @property
     def native_value(self) -> Optional[float]:
         """Return the state of the sensor."""
-        balance = self._get_balance()
-        if balance is None:
-            return None
-        
-        # Für Fiat-Wallets: Balance = Wert (kein Preis nötig)
-        if self._category == "fiat":
-            try:
-                return float(balance)
-            except (ValueError, TypeError):
-                return None
-            
-        # Für andere Wallets: Balance * Preis
-        price = self._get_price()
-        if price is None:
-            return balance  # Return balance without price conversion
-            
-        try:
-            return float(balance) * float(price)
-        except (ValueError, TypeError):
-            return None
+        view = self._views.wallet(self._wallet_id)
+        return view.value if view else None
 
-    def _get_balance(self) -> Optional[str]:
-        """Get balance from wallet data."""
-        if not self.coordinator.data:
-            return None
+    @property
+    def extra_state_attributes(self) -> Mapping[str, Any]:
+        """Return additional attributes."""
+        view = self._views.wallet(self._wallet_id)
+        attributes = view.attributes if view else {}
+        freshness = self._stale_guard.freshness_attributes("wallets")
+        return {**attributes, **freshness} if freshness else attributes
+
+
+class BitpandaPortfolioReturnSensor(CoordinatorEntity, SensorEntity):
+    """Representation of a time-weighted portfolio return sensor."""
 
-        # Check fiat wallets
-        if self._category == "fiat":
-            fiat_data = self.coordinator.data.get("fiat_wallets", {})
-            if "data" in fiat_data:
-                for wallet in fiat_data["data"]:
-                    if wallet["attributes"].get("fiat_symbol") == self._symbol:
-                        return wallet["attributes"].get("balance")
-
-        # Check asset wallets
-        asset_data = self.coordinator.data.get("asset_wallets", {})
-        if "data" in asset_data and "attributes" in asset_data["data"]:
-            # Parse category (könnte "commodity_metal" oder "cryptocoin" sein)
-            parts = self._category.split("_", 1)
-            parent_category = parts[0]
-            sub_category = parts[1] if len(parts) > 1 else None
-            
-            # Hole die Kategorie-Daten
-            category_data = asset_data["data"]["attributes"].get(parent_category)
-            
-            if category_data:
-                # Verschachtelte Struktur (z.B. commodity.metal, index.index)
-                if sub_category and isinstance(category_data, dict):
-                    sub_data = category_data.get(sub_category)
-                    if sub_data and "attributes" in sub_data and "wallets" in sub_data["attributes"]:
-                        for wallet in sub_data["attributes"]["wallets"]:
-                            if wallet["attributes"].get("cryptocoin_symbol") == self._symbol:
-                                return wallet["attributes"].get("balance")
-                
-                # Direkte Struktur (z.B. cryptocoin)
-                elif isinstance(category_data, dict) and "attributes" in category_data and "wallets" in category_data["attributes"]:
-                    for wallet in category_data["attributes"]["wallets"]:
-                        if wallet["attributes"].get("cryptocoin_symbol") == self._symbol:
-                            return wallet["attributes"].get("balance")
-
-        return None
-
-    def _get_price(self) -> Optional[str]:
-        """Get price from price coordinator."""
-        if (
-            self._price_coordinator.data
-            and self._symbol in self._price_coordinator.data
-        ):
-            price_data = self._price_coordinator.data[self._symbol]
-            return price_data.get(self._currency)
-        return None
+    _attr_has_entity_name = True
+
+    def __init__(self, coordinator, config_entry, tracker, period):
+        """Initialize the sensor."""
+        super().__init__(coordinator)
+        self._tracker = tracker
+        self._period = period
+        self._attr_name = f"Bitpanda Portfolio Return {RETURN_PERIODS[period]}"
+        self._attr_unique_id = f"{config_entry.entry_id}_portfolio_return_{period}"
+        self._attr_native_unit_of_measurement = PERCENTAGE
+        self._attr_state_class = SensorStateClass.MEASUREMENT
+        self._attr_icon = "mdi:chart-areaspline"
+        self._attr_suggested_display_precision = 2
+
+    @property
+    def native_value(self) -> Optional[float]:
+        """Return the state of the sensor."""
+        return self._tracker.period_return(self._period)
 
     @property
     def extra_state_attributes(self) -> Dict[str, Any]:
         """Return additional attributes."""
-        balance = self._get_balance()
-        price = self._get_price()
-        
+        start = self._tracker.period_start(self._period)
+        return {
+            "period": self._period,
+            "since": start.isoformat() if start else None,
+            "sensor_type": SENSOR_TYPE_PORTFOLIO_RETURN,
+            "method": "time_weighted",
+        }
+
+
+class BitpandaActivitySensor(CoordinatorEntity, SensorEntity):
+    """Representation of a staking-reward or savings-plan total of one asset."""
+
+    _attr_has_entity_name = True
+
+    def __init__(self, coordinator, config_entry, activity, stream, symbol, currency):
+        """Initialize the sensor."""
+        super().__init__(coordinator)
+        self._activity = activity
+        self._stream = stream
+        self._symbol = symbol
+        self._currency = currency
+        if stream == STREAM_STAKING:
+            self._attr_name = f"Bitpanda {symbol} Staking Rewards"
+            self._attr_icon = "mdi:hand-coin"
+        else:
+            self._attr_name = f"Bitpanda {symbol} Savings Plan"
+            self._attr_icon = "mdi:piggy-bank"
+        self._attr_unique_id = f"{config_entry.entry_id}_{stream}_{symbol}"
+        self._attr_native_unit_of_measurement = symbol
+        self._attr_state_class = SensorStateClass.TOTAL_INCREASING
+
+    @property
+    def native_value(self) -> Optional[float]:
+        """Return the state of the sensor."""
+        total = self._activity.totals(self._stream).get(self._symbol)
+        if not total:
+            return None
+        return float(total["amount"])
+
+    @property
+    def extra_state_attributes(self) -> Dict[str, Any]:
+        """Return additional attributes."""
+        total = self._activity.totals(self._stream).get(self._symbol) or {}
+        last = total.get("last")
         attributes = {
-            "wallet_id": self._wallet_id,
             "asset": self._symbol,
-            "category": self._category,
-            "balance": balance,
-            "currency": self._currency,
+            "count": total.get("count", 0),
+            "last": dt_util.utc_from_timestamp(last).isoformat() if last else None,
         }
-        
-        # Füge "price" nur hinzu wenn es KEIN Fiat-Wallet ist
-        if self._category != "fiat":
-            attributes["price"] = price
-        
+        if self._stream == STREAM_STAKING:
+            attributes["sensor_type"] = SENSOR_TYPE_STAKING_REWARDS
+        else:
+            attributes["sensor_type"] = SENSOR_TYPE_SAVINGS_PLAN
+            # Investierter Betrag in der Portfolio-Währung; andere Währungen getrennt
+            invested = total.get("invested", {})
+            attributes["invested"] = float(invested.get(self._currency, 0))
+            attributes["currency"] = self._currency
+            other = {
+                symbol: float(amount)
+                for symbol, amount in invested.items()
+                if symbol != self._currency
+            }
+            if other:
+                attributes["invested_other_currencies"] = other
+        return attributes
+
+
+class BitpandaApiStatusSensor(CoordinatorEntity, SensorEntity):
+    """Diagnostic sensor for the circuit breakers of the API endpoints."""
+
+    _attr_has_entity_name = True
+
+    def __init__(
+        self,
+        price_coordinator,
+        wallet_coordinator,
+        config_entry,
+        client,
+        stale_guard,
+    ):
+        """Initialize the sensor."""
+        super().__init__(price_coordinator)
+        self._wallet_coordinator = wallet_coordinator
+        self._client = client
+        self._stale_guard = stale_guard
+        self._attr_name = "Bitpanda API Status"
+        self._attr_unique_id = f"{config_entry.entry_id}_api_status"
+        self._attr_translation_key = "api_status"
+        self._attr_device_class = SensorDeviceClass.ENUM
+        self._attr_options = BREAKER_STATES
+        self._attr_entity_category = EntityCategory.DIAGNOSTIC
+        self._attr_icon = "mdi:electric-switch"
+
+    @property
+    def available(self) -> bool:
+        """Return True; the breaker state is known even if the API is down."""
+        return True
+
+    async def async_added_to_hass(self) -> None:
+        """Also update when the wallet coordinator refreshes."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self._wallet_coordinator.async_add_listener(
+                self._handle_coordinator_update
+            )
+        )
+
+    @property
+    def native_value(self) -> str:
+        """Return the worst breaker state across all endpoints."""
+        states = [breaker.state for breaker in self._client.breakers.values()]
+        for state in reversed(BREAKER_STATES):
+            if state in states:
+                return state
+        return STATE_CLOSED
+
+    @property
+    def extra_state_attributes(self) -> Dict[str, Any]:
+        """Return additional attributes."""
+        attributes: Dict[str, Any] = {"sensor_type": SENSOR_TYPE_API_STATUS}
+        for endpoint, breaker in self._client.breakers.items():
+            attributes[endpoint] = breaker.state
+            if breaker.failures:
+                attributes[f"{endpoint}_failures"] = breaker.failures
+            if breaker.opened_at:
+                attributes[f"{endpoint}_open_since"] = breaker.opened_at.isoformat()
+        for key in ("prices", "wallets"):
+            attributes[f"{key}_stale"] = bool(self._stale_guard.stale.get(key))
         return attributes
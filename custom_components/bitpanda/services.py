@@ -0,0 +1,140 @@
+"""Services for the Bitpanda integration."""
+import asyncio
+import logging
+
+import voluptuous as vol
+from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.exceptions import ServiceValidationError
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.debounce import Debouncer
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+from homeassistant.util import dt as dt_util
+
+from .api import BitpandaApiClient
+from .const import (
+    ATTR_CASSETTE,
+    ATTR_TARGET,
+    CASSETTE_DIR,
+    DOMAIN,
+    REFRESH_DEBOUNCE_COOLDOWN,
+    REFRESH_TARGET_ALL,
+    REFRESH_TARGET_PRICES,
+    REFRESH_TARGET_WALLETS,
+    REFRESH_TARGETS,
+    SERVICE_REFRESH,
+    SERVICE_START_RECORDING,
+    SERVICE_STOP_RECORDING,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+REFRESH_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_TARGET, default=REFRESH_TARGET_ALL): vol.In(REFRESH_TARGETS),
+    }
+)
+
+STOP_RECORDING_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_CASSETTE): vol.All(cv.string, cv.slugify),
+    }
+)
+
+
+def create_refresh_debouncer(
+    hass: HomeAssistant,
+    client: BitpandaApiClient,
+    coordinator: DataUpdateCoordinator,
+    endpoints: tuple[str, ...],
+) -> Debouncer:
+    """Create a debouncer that coalesces on-demand refreshes of a coordinator."""
+
+    async def _async_budgeted_refresh() -> None:
+        """Refresh the coordinator once the rate budget allows it."""
+        # Nicht verzögert ausführen, sondern warten bis das Rate-Budget passt
+        wait = client.seconds_until_allowed(*endpoints)
+        if wait > 0:
+            _LOGGER.debug(
+                "Delaying %s refresh by %.1f s to respect the rate budget",
+                coordinator.name,
+                wait,
+            )
+            await asyncio.sleep(wait)
+        await coordinator.async_refresh()
+
+    # immediate=False: alle Aufrufe im Cooldown-Fenster ergeben genau einen Abruf
+    return Debouncer(
+        hass,
+        _LOGGER,
+        cooldown=REFRESH_DEBOUNCE_COOLDOWN,
+        immediate=False,
+        function=_async_budgeted_refresh,
+    )
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the Bitpanda services."""
+    if hass.services.has_service(DOMAIN, SERVICE_REFRESH):
+        return
+
+    async def async_handle_refresh(call: ServiceCall) -> None:
+        """Request a debounced refresh of prices and/or wallets."""
+        target = call.data[ATTR_TARGET]
+        for entry_data in hass.data.get(DOMAIN, {}).values():
+            debouncers = entry_data["refresh_debouncers"]
+            if target in (REFRESH_TARGET_ALL, REFRESH_TARGET_PRICES):
+                await debouncers[REFRESH_TARGET_PRICES].async_call()
+            if target in (REFRESH_TARGET_ALL, REFRESH_TARGET_WALLETS):
+                await debouncers[REFRESH_TARGET_WALLETS].async_call()
+
+    async def async_handle_start_recording(call: ServiceCall) -> None:
+        """Start recording API traffic into a cassette."""
+        for entry_data in hass.data.get(DOMAIN, {}).values():
+            entry_data["client"].start_recording()
+        _LOGGER.info("Recording Bitpanda API traffic")
+
+    async def async_handle_stop_recording(call: ServiceCall) -> None:
+        """Stop recording and write one sanitized cassette per entry."""
+        name = call.data.get(ATTR_CASSETTE) or dt_util.now().strftime("%Y%m%d_%H%M%S")
+        clients = {
+            entry_id: entry_data["client"]
+            for entry_id, entry_data in hass.data.get(DOMAIN, {}).items()
+            if entry_data["client"].recording
+        }
+        if not clients:
+            raise ServiceValidationError("Bitpanda traffic is not being recorded")
+
+        # Erst alle Aufzeichnungen beenden, damit ein Schreibfehler keine offen lässt
+        recorders = {
+            entry_id: client.stop_recording() for entry_id, client in clients.items()
+        }
+        for entry_id, recorder in recorders.items():
+            path = hass.config.path(CASSETTE_DIR, f"{name}_{entry_id}.json")
+            count = await hass.async_add_executor_job(recorder.save, path)
+            _LOGGER.info(
+                "Saved %d recorded interactions to %s%s",
+                count,
+                path,
+                " (recording limit reached)" if recorder.truncated else "",
+            )
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_REFRESH, async_handle_refresh, schema=REFRESH_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_START_RECORDING, async_handle_start_recording
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_STOP_RECORDING,
+        async_handle_stop_recording,
+        schema=STOP_RECORDING_SCHEMA,
+    )
+
+
+def async_unload_services(hass: HomeAssistant) -> None:
+    """Remove the Bitpanda services once no entry is left."""
+    if hass.data.get(DOMAIN):
+        return
+    for service in (SERVICE_REFRESH, SERVICE_START_RECORDING, SERVICE_STOP_RECORDING):
+        hass.services.async_remove(DOMAIN, service)
@@ -0,0 +1,187 @@
+"""Precomputed per-refresh view models for Bitpanda sensors."""
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
+
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+
+
+@dataclass(frozen=True, slots=True)
+class PriceView:
+    """State of a price sensor for one refresh."""
+
+    value: Optional[float]
+    precision: int
+    attributes: Mapping[str, Any]
+
+
+@dataclass(frozen=True, slots=True)
+class WalletView:
+    """State of a wallet sensor for one refresh."""
+
+    value: Optional[float]
+    attributes: Mapping[str, Any]
+
+
+_EMPTY_ATTRIBUTES: Mapping[str, Any] = MappingProxyType({})
+
+
+def parse_wallet_id(wallet_id: str) -> Tuple[str, str]:
+    """Split a wallet_id into category and symbol."""
+    # Parse wallet_id (könnte "commodity_metal_XAU" oder "cryptocoin_BTC" sein)
+    parts = wallet_id.split("_")
+    if len(parts) >= 3:
+        # Verschachtelte Kategorie (z.B. commodity_metal_XAU)
+        return f"{parts[0]}_{parts[1]}", "_".join(parts[2:])
+    # Einfache Kategorie (z.B. cryptocoin_BTC)
+    return parts[0], "_".join(parts[1:])
+
+
+def _to_float(value: Any) -> Optional[float]:
+    """Convert an API value to float."""
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def price_precision(raw: Any, value: Optional[float]) -> int:
+    """Return the display precision based on the API's decimal places."""
+    if value is None or value == 0:
+        return 2
+
+    # Zähle die tatsächlichen Dezimalstellen im Original-String der API
+    original_value = str(raw)
+    if "." in original_value:
+        # Maximal 8 Dezimalstellen für sehr kleine Werte
+        return min(len(original_value.split(".")[1]), 8)
+
+    # Fallback: Berechne basierend auf dem Wertbereich
+    if value >= 10:
+        return 2
+    if value >= 1:
+        return 4
+    if value >= 0.01:
+        return 5
+    if value >= 0.001:
+        return 6
+    if value >= 0.0001:
+        return 7
+    return 8
+
+
+class SensorViewCache:
+    """Build all sensor views in one pass per coordinator refresh.
+
+    Views are rebuilt lazily the first time any entity reads them after the
+    coordinator data object changed; every other read is a dict lookup.
+    """
+
+    def __init__(
+        self,
+        price_coordinator: DataUpdateCoordinator,
+        wallet_coordinator: DataUpdateCoordinator,
+        currency: str,
+        assets: Iterable[str],
+        wallet_ids: Iterable[str],
+    ) -> None:
+        """Initialize the cache."""
+        self._price_coordinator = price_coordinator
+        self._wallet_coordinator = wallet_coordinator
+        self._currency = currency
+        self._assets = tuple(assets)
+        self._wallets = {
+            wallet_id: parse_wallet_id(wallet_id) for wallet_id in wallet_ids
+        }
+        self._price_source: Any = None
+        self._wallet_source: Tuple[Any, Any] = (None, None)
+        self._price_views: Dict[str, PriceView] = {}
+        self._wallet_views: Dict[str, WalletView] = {}
+
+    def price(self, asset: str) -> Optional[PriceView]:
+        """Return the current view of a price sensor."""
+        ticker = self._price_coordinator.data
+        if ticker is not self._price_source:
+            self._price_source = ticker
+            self._price_views = self._build_price_views(ticker)
+        return self._price_views.get(asset)
+
+    def wallet(self, wallet_id: str) -> Optional[WalletView]:
+        """Return the current view of a wallet sensor."""
+        source = (self._wallet_coordinator.data, self._price_coordinator.data)
+        if (
+            source[0] is not self._wallet_source[0]
+            or source[1] is not self._wallet_source[1]
+        ):
+            self._wallet_source = source
+            self._wallet_views = self._build_wallet_views(*source)
+        return self._wallet_views.get(wallet_id)
+
+    def _build_price_views(
+        self, ticker: Optional[Dict[str, Any]]
+    ) -> Dict[str, PriceView]:
+        """Build the views of all price sensors."""
+        views: Dict[str, PriceView] = {}
+        for asset in self._assets:
+            if not ticker or asset not in ticker:
+                views[asset] = PriceView(None, 2, _EMPTY_ATTRIBUTES)
+                continue
+            price_data = ticker[asset]
+            raw = price_data.get(self._currency)
+            value = _to_float(raw)
+            views[asset] = PriceView(
+                value,
+                price_precision(raw, value),
+                MappingProxyType(
+                    {
+                        "asset": asset,
+                        "currency": self._currency,
+                        "trading_pair": f"{asset}/{self._currency}",
+                        "sensor_type": "price_tracker",
+                        "all_prices": price_data,
+                    }
+                ),
+            )
+        return views
+
+    def _build_wallet_views(
+        self,
+        wallet_data: Optional[Dict[str, Any]],
+        ticker: Optional[Dict[str, Any]],
+    ) -> Dict[str, WalletView]:
+        """Build the views of all wallet sensors."""
+        views: Dict[str, WalletView] = {}
+        for wallet_id, (category, symbol) in self._wallets.items():
+            balance = None
+            if wallet_data:
+                key = "fiat_wallets" if category == "fiat" else "asset_wallets"
+                wallet = wallet_data.get(key, {}).get(wallet_id)
+                if wallet is not None:
+                    balance = wallet["balance"]
+
+            attributes = {
+                "wallet_id": wallet_id,
+                "asset": symbol,
+                "category": category,
+                "balance": balance,
+                "currency": self._currency,
+            }
+            amount = _to_float(balance)
+
+            # Für Fiat-Wallets: Balance = Wert (kein Preis nötig)
+            if category == "fiat":
+                value = amount
+            else:
+                price = None
+                if ticker and symbol in ticker:
+                    price = ticker[symbol].get(self._currency)
+                attributes["price"] = price
+                # Ohne Preis wird die Balance ohne Umrechnung geliefert
+                if price is None or amount is None:
+                    value = amount
+                else:
+                    price_value = _to_float(price)
+                    value = None if price_value is None else amount * price_value
+
+            views[wallet_id] = WalletView(value, MappingProxyType(attributes))
+        return views